@@ -94,18 +94,55 @@ def action(obtained_data):
                 facial_expression.face_selected.append(i)
         obtained_data['misc'].clear()
 
-def data_opu(action):
-    old_message = {}
+class OpuNotifier:
+    """
+    Hands each new FEAGI message to the OPU thread exactly once. Messages are told apart by their
+    burst counter, so the same burst seen twice does not run action() again.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.message = None
+        self.burst_id = None
+        self.pending = False
+
+    def notify(self, message):
+        burst_id = message.get('burst_counter', id(message))
+        with self.condition:
+            if burst_id == self.burst_id:
+                return
+            self.burst_id = burst_id
+            self.message = message
+            self.pending = True
+            self.condition.notify()
+
+    def wait(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending)
+            self.pending = False
+            return self.message
+
+
+def watch_opu(notifier):
+    # pns offers no callback, but it stores every received message as a new object, so an identity
+    # check is enough to spot one; no dict comparison
+    last_message = None
     while True:
         message_from_feagi = pns.message_from_feagi
-        if old_message != message_from_feagi:
-            if message_from_feagi:
-                if pns.full_template_information_corticals:
-                    obtained_signals = pns.obtain_opu_data(message_from_feagi)
-                    action(obtained_signals)
+        if message_from_feagi and message_from_feagi is not last_message:
+            last_message = message_from_feagi
+            notifier.notify(message_from_feagi)
         sleep(0.001)
 
 
+def data_opu(action, notifier):
+    while True:
+        message_from_feagi = notifier.wait()
+        if pns.full_template_information_corticals:
+            obtained_signals = pns.obtain_opu_data(message_from_feagi)
+            action(obtained_signals)
+
+
 if __name__ == '__main__':
     config = FEAGI.build_up_from_configuration()
     feagi_settings = config['feagi_settings'].copy()
@@ -147,8 +184,11 @@ if __name__ == '__main__':
     threading.Thread(target=retina.vision_progress,
                      args=(default_capabilities,feagi_settings,
                            cozmo_functions.camera_data,), daemon=True).start()
-    threading.Thread(target=data_opu, args=(action, ), daemon=True).start()
+    opu_notifier = OpuNotifier()
+    threading.Thread(target=watch_opu, args=(opu_notifier, ), daemon=True).start()
+    threading.Thread(target=data_opu, args=(action, opu_notifier), daemon=True).start()
     time.sleep(2)
+    last_frame_sequence = 0
     # vision ends
 
     while True:
@@ -192,14 +232,17 @@ if __name__ == '__main__':
                 #                 cozmo_functions.display_lines(cli)
 
             # Vision section START
-            raw_frame = cozmo_functions.camera_data['vision']
-            previous_frame_data, rgb, default_capabilities = retina.process_visual_stimuli(
-                raw_frame,
-                default_capabilities,
-                previous_frame_data,
-                rgb, capabilities)
-            if rgb:
-                message_to_feagi = pns.generate_feagi_data(rgb, message_to_feagi)
+            # Only frames that arrived since the last burst go through the retina
+            frame_sequence, raw_frame = cozmo_functions.camera_frames.latest()
+            if frame_sequence != last_frame_sequence:
+                last_frame_sequence = frame_sequence
+                previous_frame_data, rgb, default_capabilities = retina.process_visual_stimuli(
+                    raw_frame,
+                    default_capabilities,
+                    previous_frame_data,
+                    rgb, capabilities)
+                if rgb:
+                    message_to_feagi = pns.generate_feagi_data(rgb, message_to_feagi)
             # Vision section END
             message_to_feagi = cozmo_ipu(cozmo_functions.robot, capabilities, angle_of_head, angle_of_arms, message_to_feagi)
             sleep(feagi_settings['feagi_burst_speed'])  # bottleneck
@@ -1,9 +1,9 @@
 import time
 import random
 import itertools
+import threading
+import numpy as np
 import pycozmo
-from feagi_connector import PIL_retina as pitina
-from feagi_connector import retina as retina
 
 
 
@@ -23,6 +23,30 @@ robot = {'accelerator': {'0': []}, "proximity": [], "gyro": {'0': []}, 'servo_he
 camera_data = {"vision": []}
 
 
+class FrameSlot:
+    """
+    Latest camera frame with a sequence number. The pycozmo event thread publishes into it and the
+    main loop reads it, processing a frame only when the sequence has moved on.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.frame = None
+
+    def publish(self, frame):
+        with self.lock:
+            self.frame = frame
+            self.sequence += 1
+
+    def latest(self):
+        with self.lock:
+            return self.sequence, self.frame
+
+
+camera_frames = FrameSlot()
+
+
 
 def drive_wheels(self, lwheel_speed: float, rwheel_speed: float,
                  lwheel_acc: Optional[float] = 0.0, rwheel_acc: Optional[float] = 0.0,
@@ -124,15 +148,11 @@ def on_body_info(cli, pkt: pycozmo.protocol_encoder.BodyInfo):
 
 
 def on_camera_image(cli, image):
-    global default_capabilities, previous_frame_data, rgb
-    # Obtain the size automatically which will be needed in next line after the next line
-    size = pitina.obtain_size(image)
-    # Convert into ndarray based on the size it gets
-    new_rgb = retina.RGB_list_to_ndarray(image.getdata(), size)
-    # update astype to work well with retina and cv2
-    raw_frame = retina.update_astype(new_rgb)
+    # One C-level conversion to a read-only uint8 (height, width, 3) array, no per-pixel lists.
+    # This runs on pycozmo's event thread, so it must return quickly and never sleep.
+    raw_frame = np.asarray(image)
     camera_data['vision'] = raw_frame
-    time.sleep(0.01)
+    camera_frames.publish(raw_frame)
 
 def vision_initalization(cli):
     cli.add_handler(pycozmo.event.EvtNewRawCameraImage, on_camera_image)
@@ -9,6 +9,7 @@ https://git.brl.ac.uk/ca2-chambers/expressive-eyes
 
 from typing import Optional, List
 import time
+from functools import lru_cache
 from collections import deque
 import pycozmo
 import numpy as np
@@ -17,6 +18,7 @@ from pycozmo.procedural_face import ProceduralFace, DEFAULT_WIDTH, DEFAULT_HEIGH
 face_selected = deque()
 eye_one_location = deque()
 eye_two_location = deque()
+FACE_CACHE_SIZE = 32  # transitions kept; each is FRAME_RATE * 2 bitmaps of 128x32 pixels
 
 __all__ = [
     "Neutral",
@@ -48,6 +50,20 @@ __all__ = [
 ]
 
 
+@lru_cache(maxsize=FACE_CACHE_SIZE)
+def render_transition(from_params, to_params, steps):
+    """
+    Display bitmaps for one expression transition, rendered the first time it is needed. Keyed on
+    the faces' parameters, so an expression whose eyes were moved gets its own entry.
+    """
+    frames = []
+    for face in pycozmo.procedural_face.interpolate(ProceduralFace(list(from_params)),
+                                                    ProceduralFace(list(to_params)), steps):
+        # The Cozmo protocol expects a 128x32 image, so take only the even lines.
+        frames.append(Image.fromarray(np.array(face.render())[::2]))
+    return tuple(frames)
+
+
 async def expressions(cli):
     expressions_array = [
         Neutral(),
@@ -77,39 +93,30 @@ async def expressions(cli):
         Amazement(),
         Excitement()
     ]
+    neutral = Neutral()
     face_ignor_threshold = 1
     last_face_expression_time = time.time()
     while True:
         if face_selected:
             if time.time() - last_face_expression_time > face_ignor_threshold:
                 last_face_expression_time = time.time()
-                face_generator = pycozmo.procedural_face.interpolate(
-                    Neutral(), expressions_array[face_selected[0]],
-                    pycozmo.robot.FRAME_RATE * 2)
-                for face in face_generator:
-                    # expressions_array[0].eyes[0].lids[1].y -= 0.1
-                    # expressions_array[0].eyes[0].lids[1].bend -= 0.1
-                    # expressions_array[0].eyes[0].lids[0].angle += 25.0
-                    # expressions_array[0].eyes[1].upper_inner_radius_x += 1.0
-                    # expressions_array[0].eyes[0].upper_inner_radius_x += 1.0
-                    # expressions_array[0].eyes[0].scale_x += 1.25
-                    # expressions_array[0].eyes[1].upper_outer_radius_x = 1.0
-                    if eye_one_location:
-                        expressions_array[0].eyes[0].center_x = eye_one_location[0][0]
-                        expressions_array[0].eyes[0].center_y = eye_one_location[0][1]
-                        eye_one_location.pop()
-                    if eye_two_location:
-                        expressions_array[0].eyes[1].center_x = eye_two_location[0][0]
-                        expressions_array[0].eyes[1].center_y = eye_two_location[0][1]
-                        eye_two_location.pop()
-                    # Render face image.
-                    im = face.render()
-                    # The Cozmo protocol expects a 128x32 image, so take only the even lines.
-                    np_im = np.array(im)
-                    np_im2 = np_im[::2]
-                    im2 = Image.fromarray(np_im2)
+                # Eye moves are applied before the transition so its frames can come from the cache
+                if eye_one_location:
+                    expressions_array[0].eyes[0].center_x = eye_one_location[0][0]
+                    expressions_array[0].eyes[0].center_y = eye_one_location[0][1]
+                    eye_one_location.clear()
+                if eye_two_location:
+                    expressions_array[0].eyes[1].center_x = eye_two_location[0][0]
+                    expressions_array[0].eyes[1].center_y = eye_two_location[0][1]
+                    eye_two_location.clear()
+                frames = render_transition(tuple(neutral.params),
+                                           tuple(expressions_array[face_selected[0]].params),
+                                           pycozmo.robot.FRAME_RATE * 2)
+                timer = pycozmo.util.FPSTimer(pycozmo.robot.FRAME_RATE)
+                for im in frames:
                     # Display face image.
-                    cli.display_image(im2)
+                    cli.display_image(im)
+                    timer.sleep()
             face_selected.pop()
             if len(face_selected) > 2:
                 temp = face_selected.pop()
@@ -59,6 +59,15 @@ class Adc:
         voltage = round(voltage, 2)
         return voltage
 
+    def readRaw(self, channel):
+        # One conversion, 0-255, without the repeat-until-stable loops above
+        if self.Index == "PCF8591":
+            self.bus.read_byte_data(self.ADDRESS, self.PCF8591_CMD + channel)  # returns the previous conversion
+            return self.bus.read_byte_data(self.ADDRESS, self.PCF8591_CMD + channel)
+        COMMAND_SET = self.ADS7830_CMD | ((((channel << 2) | (channel >> 1)) & 0x07) << 4)
+        self.bus.write_byte(self.ADDRESS, COMMAND_SET)
+        return self.bus.read_byte(self.ADDRESS)
+
     def recvADC(self, channel):
         if self.Index == "PCF8591":
             data = self.recvPCF8591(channel)
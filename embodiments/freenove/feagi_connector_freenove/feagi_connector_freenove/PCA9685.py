@@ -29,12 +29,20 @@ class PCA9685:
   __ALLLED_ON_H        = 0xFB
   __ALLLED_OFF_L       = 0xFC
   __ALLLED_OFF_H       = 0xFD
+  __AUTO_INCREMENT     = 0x20
+  __BLOCK_CHANNELS     = 8     # 8 channels x 4 registers = 32 bytes, the SMBus block limit
 
   def __init__(self, address=0x40, debug=False):
     self.bus = smbus.SMBus(1)
     self.address = address
     self.debug = debug
-    self.write(self.__MODE1, 0x00)
+    self.channel_values = {}   # channel: (on, off) last written to the chip
+    self.staged = None         # channel: (on, off) waiting for flush() while a frame is open
+    self.bus_time = 0.0        # seconds spent on the bus by the last flush()
+    self.transactions = 0      # block writes issued by the last flush()
+    self.skipped = 0           # channels left alone by the last flush() because nothing changed
+    # Auto-increment lets one block write cover all four registers of consecutive channels
+    self.write(self.__MODE1, self.__AUTO_INCREMENT)
     
   def write(self, reg, value):
     "Writes an 8-bit value to the specified register/address"
@@ -63,11 +71,41 @@ class PCA9685:
     self.write(self.__MODE1, oldmode | 0x80)
 
   def setPWM(self, channel, on, off):
-    "Sets a single PWM channel"
-    self.write(self.__LED0_ON_L+4*channel, on & 0xFF)
-    self.write(self.__LED0_ON_H+4*channel, on >> 8)
-    self.write(self.__LED0_OFF_L+4*channel, off & 0xFF)
-    self.write(self.__LED0_OFF_H+4*channel, off >> 8)
+    "Sets a single PWM channel, or stages it when a frame is open"
+    if self.staged is not None:
+      self.staged[channel] = (on, off)
+    elif self.channel_values.get(channel) != (on, off):
+      self.bus.write_i2c_block_data(self.address, self.__LED0_ON_L+4*channel,
+                                    [on & 0xFF, on >> 8, off & 0xFF, off >> 8])
+      self.channel_values[channel] = (on, off)
+
+  def begin_frame(self):
+    "Stage every setPWM until flush(), so a burst's motor and servo updates go out together"
+    if self.staged is None:
+      self.staged = {}
+
+  def flush(self):
+    "Writes the staged channels that changed, merging neighbouring channels into one block write"
+    staged, self.staged = self.staged or {}, None
+    changed = sorted(channel for channel, value in staged.items()
+                     if self.channel_values.get(channel) != value)
+    self.skipped = len(staged) - len(changed)
+    self.transactions = 0
+    start = time.time()
+    run = []
+    for channel in changed + [None]:
+      if run and (channel is None or channel != run[-1] + 1 or len(run) == self.__BLOCK_CHANNELS):
+        data = []
+        for run_channel in run:
+          on, off = staged[run_channel]
+          data += [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+          self.channel_values[run_channel] = (on, off)
+        self.bus.write_i2c_block_data(self.address, self.__LED0_ON_L+4*run[0], data)
+        self.transactions += 1
+        run = []
+      if channel is not None:
+        run.append(channel)
+    self.bus_time = time.time() - start
   def setMotorPwm(self,channel,duty):
     self.setPWM(channel,0,duty)
   def setServoPulse(self, channel, pulse):
@@ -0,0 +1,76 @@
+# Reads every ADC channel on a schedule and filters them together, instead of polling one channel
+# until two reads agree. Photoresistors are on channels 0 and 1, the battery divider on channel 2.
+import numpy as np
+
+
+class KalmanFilterArray:
+    """The Kalman_filter from robot_dog/Kalman.py, applied to a vector of channels at once."""
+
+    def __init__(self, channels, Q=0.001, R=0.1):
+        self.Q = Q
+        self.R = R
+        self.P_k1_k1 = np.ones(channels)
+        self.kalman_adc_old = np.zeros(channels)
+
+    def kalman(self, ADC_Value):
+        # Large jumps are blended in immediately; small ones are smoothed
+        x_k_k1 = np.where(np.abs(self.kalman_adc_old - ADC_Value) >= 60,
+                          ADC_Value * 0.400 + self.kalman_adc_old * 0.600,
+                          self.kalman_adc_old)
+        P_k_k1 = self.P_k1_k1 + self.Q
+        Kg = P_k_k1 / (P_k_k1 + self.R)
+        kalman_adc = x_k_k1 + Kg * (ADC_Value - self.kalman_adc_old)
+        self.P_k1_k1 = (1 - Kg) * P_k_k1
+        self.kalman_adc_old = kalman_adc
+        return kalman_adc
+
+
+def process_noise(R, interval, time_constant):
+    # Q that settles the filter at the gain of a first-order low-pass with this time constant when
+    # sampled every interval seconds: steady state gives Q / R = K^2 / (1 - K)
+    gain = 1 - np.exp(-interval / time_constant)
+    return R * gain * gain / (1 - gain)
+
+
+class AdcSampler:
+    """
+    Filters all channels together. The robot dog's Q=0.001, R=0.1 assume a read every few
+    milliseconds and would take around ten seconds to follow a change at the 1 s battery period, so Q
+    is derived from the actual sample interval to settle within about time_constant seconds instead.
+    Raw readings also go into a ring buffer of the last `history` samples, for readers that want a
+    median instead of the filtered value.
+    """
+
+    def __init__(self, adc, channels=(0, 1, 2), history=16, interval=1.0, time_constant=3.0, R=0.1):
+        self.adc = adc
+        self.channels = list(channels)
+        self.raw = np.zeros((history, len(self.channels)))  # ring buffer of raw 0-255 readings
+        self.index = 0  # samples taken; the next one goes to raw[index % history]
+        self.filter = KalmanFilterArray(len(self.channels), process_noise(R, interval, time_constant), R)
+        self.latest = np.zeros(len(self.channels))  # filtered voltages, replaced whole on each sample
+
+    def sample(self):
+        reading = np.array([self.adc.readRaw(channel) for channel in self.channels], dtype=float)
+        if self.index == 0:
+            self.filter.kalman_adc_old = reading.copy()  # start from the first reading, not from 0
+        self.raw[self.index % len(self.raw)] = reading
+        self.index += 1
+        self.latest = np.round(self.filter.kalman(reading) / 255.0 * 3.3, 2)
+        return self.latest
+
+    def voltage(self, channel):
+        return float(self.latest[self.channels.index(channel)])
+
+    def history(self):
+        # Raw readings taken so far, oldest first, as a (samples, channels) array
+        if self.index <= len(self.raw):
+            return self.raw[:self.index].copy()
+        start = self.index % len(self.raw)
+        return np.concatenate((self.raw[start:], self.raw[:start]))
+
+    def median_voltage(self, channel):
+        # Median of the buffered raw readings, so a single sag under motor load does not show
+        samples = self.history()[:, self.channels.index(channel)]
+        if not len(samples):
+            return 0.0
+        return round(float(np.median(samples)) / 255.0 * 3.3, 2)
@@ -1,7 +1,6 @@
 import sys
 import cv2
 import time
-import asyncio
 import argparse
 import traceback
 import threading
@@ -16,19 +15,35 @@ from feagi_connector import sensors as sensors
 from feagi_connector import pns_gateway as pns
 from feagi_connector import actuators as actuators
 from feagi_connector_freenove.PCA9685 import PCA9685
+from feagi_connector_freenove.ir_sensor import IR
+from feagi_connector_freenove.sensor_hub import SensorHub
+from feagi_connector_freenove.adc_sampler import AdcSampler
+from feagi_connector_freenove.slots import LatestSlot, DeltaSlot
 from feagi_connector import feagi_interface as FEAGI
 from feagi_connector_freenove.version import __version__
 
-ir_data = deque()
-ultrasonic_data = deque()
 feagi_dict = deque()
 feagi_settings = dict()
-raw_frame_internal = {'0': []}
+camera_frames = LatestSlot()  # capture -> vision worker
+vision_results = DeltaSlot()  # vision worker -> main loop
 
 
 class LED:
     def __init__(self):
         self.led = Led()
+        self.last_color = {}  # led_ID -> (R, B, G) last pushed to the strip
+        self.writes = 0
+        self.writes_avoided = 0
+
+    def set(self, led_ID, Red_Intensity, Blue_Intensity, Green_intensity):
+        # Every ledIndex call refreshes the whole strip, so only send colors that changed
+        color = (Red_Intensity, Blue_Intensity, Green_intensity)
+        if self.last_color.get(led_ID) == color:
+            self.writes_avoided += 1
+            return
+        self.last_color[led_ID] = color
+        self.writes += 1
+        self.LED_on(led_ID, *color)
 
     def LED_on(self, led_ID, Red_Intensity, Blue_Intensity, Green_intensity):
         """
@@ -76,31 +91,35 @@ class Servo:
     class to work with functions.
     """
 
-    def __init__(self):
-        self.PwmServo = PCA9685(0x40, debug=True)
-        self.PwmServo.setPWMFreq(50)
+    # servo channel -> (PCA9685 channel, sign, pulse offset in us); servo 0 is mounted reversed
+    channel_table = {'0': (8, -1, 2500)}
+    channel_table.update({str(servo): (8 + servo, 1, 500) for servo in range(1, 8)})
+
+    def __init__(self, pwm=None, deadband=0.5):
+        if pwm is None:
+            pwm = PCA9685(0x40, debug=True)
+            pwm.setPWMFreq(50)
+        self.PwmServo = pwm
         self.device_position = float()
         self.servo_ranges = {i: [10, 170] for i in range(13)}
         self.servo_ranges[1] = [76, 140]
+        self.deadband = deadband  # degrees; smaller changes are not sent to the servo
+        self.last_angle = {}
+        self.writes = 0
+        self.writes_avoided = 0
 
     def setServoPwm(self, channel, angle, error=10):
         angle = float(angle)
-        if channel == '0':
-            self.PwmServo.setServoPulse(8, 2500 - float((angle + error) / 0.09))
-        elif channel == '1':
-            self.PwmServo.setServoPulse(9, 500 + float((angle + error) / 0.09))
-        elif channel == '2':
-            self.PwmServo.setServoPulse(10, 500 + float((angle + error) / 0.09))
-        elif channel == '3':
-            self.PwmServo.setServoPulse(11, 500 + float((angle + error) / 0.09))
-        elif channel == '4':
-            self.PwmServo.setServoPulse(12, 500 + float((angle + error) / 0.09))
-        elif channel == '5':
-            self.PwmServo.setServoPulse(13, 500 + float((angle + error) / 0.09))
-        elif channel == '6':
-            self.PwmServo.setServoPulse(14, 500 + float((angle + error) / 0.09))
-        elif channel == '7':
-            self.PwmServo.setServoPulse(15, 500 + float((angle + error) / 0.09))
+        if channel not in self.channel_table:
+            return
+        last_angle = self.last_angle.get(channel)
+        if last_angle is not None and abs(angle - last_angle) < self.deadband:
+            self.writes_avoided += 1
+            return
+        self.last_angle[channel] = angle
+        self.writes += 1
+        pca_channel, sign, offset = self.channel_table[channel]
+        self.PwmServo.setServoPulse(pca_channel, offset + sign * (angle + error) / 0.09)
 
     def set_default_position(self, capabilities):
         try:
@@ -215,9 +234,11 @@ class Servo:
 
 
 class Motor:
-    def __init__(self):
-        self.pwm = PCA9685(0x40, debug=True)
-        self.pwm.setPWMFreq(50)
+    def __init__(self, pwm=None):
+        if pwm is None:
+            pwm = PCA9685(0x40, debug=True)
+            pwm.setPWMFreq(50)
+        self.pwm = pwm
         self.motor_channels = [[0, 1], [3, 2], [4, 5], [6, 7]]
 
     @staticmethod
@@ -341,90 +362,116 @@ class Motor:
             return abs(power)
 
 
-class IR:
-    def __init__(self):
-        self.IR01 = 14
-        self.IR02 = 15
-        self.IR03 = 23
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setwarnings(False)
-        GPIO.setup(self.IR01, GPIO.IN)
-        GPIO.setup(self.IR02, GPIO.IN)
-        GPIO.setup(self.IR03, GPIO.IN)
-
-    def read(self):
-        gpio_state = []
-        ir_sensors = [self.IR01, self.IR02, self.IR03]
-        for idx, sensor in enumerate(ir_sensors):
-            if GPIO.input(sensor):
-                gpio_state.append(idx)
-        return gpio_state
-
-
 class Ultrasonic:
-    def __init__(self):
+    """
+    Edge-driven ranging: the echo pin raises a callback on both edges, so the pulse width comes from
+    two timestamps instead of a busy-wait. Each read() sends one ping; call it no faster than the
+    proximity ping_interval so a late echo from the previous ping is not mistaken for the current one.
+    The median of the last readings is published in self.distance, which readers take without a lock.
+    A ping with no echo, or one beyond MAX_DISTANCE, counts as 0 as pulseIn did, so the distance
+    falls back to 0 once an obstacle is gone.
+    """
+
+    def __init__(self, samples=5):
         GPIO.setwarnings(False)
         self.trigger_pin = 27
         self.echo_pin = 22
         self.MAX_DISTANCE = 300  # define the maximum measuring distance, unit: cm
-        self.timeOut = self.MAX_DISTANCE * 60  # calculate timeout according to the maximum measuring distance
+        self.readings = deque(maxlen=samples)
+        self.echo_start = None
+        self.answered = True  # whether the last ping got its echo
+        self.distance = 0  # latest median distance, unit: m
         GPIO.setmode(GPIO.BCM)
         GPIO.setup(self.trigger_pin, GPIO.OUT)
         GPIO.setup(self.echo_pin, GPIO.IN)
+        GPIO.add_event_detect(self.echo_pin, GPIO.BOTH, callback=self.echo_edge)
+
+    def echo_edge(self, pin):
+        now = time.perf_counter()
+        if GPIO.input(pin):
+            self.echo_start = now
+        elif self.echo_start is not None:
+            distance_cm = (now - self.echo_start) * 34000.0 / 2.0  # sound speed 340m/s
+            self.echo_start = None
+            self.answered = True
+            self.record(distance_cm if distance_cm <= self.MAX_DISTANCE else 0)
+
+    def record(self, distance_cm):
+        self.readings.append(distance_cm)
+        self.distance = int(sorted(self.readings)[len(self.readings) // 2]) / 100
+
+    def ping(self):
+        if not self.answered:
+            self.record(0)  # the previous ping timed out
+        self.answered = False
+        self.echo_start = None  # forget an echo that never finished
+        GPIO.output(self.trigger_pin, GPIO.HIGH)  # make trigger_pin output 10us HIGH level
+        time.sleep(0.00001)  # 10us
+        GPIO.output(self.trigger_pin, GPIO.LOW)  # make trigger_pin output LOW level
+
+    def read(self):
+        # Sends the next ping and returns the distance measured from the earlier ones
+        self.ping()
+        return self.distance
 
-    def pulseIn(self, pin, level, timeOut):  # obtain pulse time of a pin under timeOut
-        t0 = time.time()
-        while (GPIO.input(pin) != level):
-            if ((time.time() - t0) > timeOut * 0.000001):
-                return 0;
-        t0 = time.time()
-        while (GPIO.input(pin) == level):
-            if ((time.time() - t0) > timeOut * 0.000001):
-                return 0;
-        pulseTime = (time.time() - t0) * 1000000
-        return pulseTime
-
-    def get_distance(self):  # get the measurement results of ultrasonic module,with unit: cm
-        distance_cm = [0, 0, 0, 0, 0]
-        for i in range(5):
-            GPIO.output(self.trigger_pin, GPIO.HIGH)  # make trigger_pin output 10us HIGH level
-            time.sleep(0.00001)  # 10us
-            GPIO.output(self.trigger_pin, GPIO.LOW)  # make trigger_pin output LOW level
-            pingTime = self.pulseIn(self.echo_pin, GPIO.HIGH, self.timeOut)  # read plus time of echo_pin
-            distance_cm[i] = pingTime * 340.0 / 2.0 / 10000.0  # calculate distance with sound speed 340m/s
-        distance_cm = sorted(distance_cm)
-        return int(distance_cm[2])/100
+    def get_distance(self):  # get the measurement results of ultrasonic module,with unit: m
+        return self.distance
 
 
 class Battery:
+    def __init__(self, adc_sampler):
+        self.adc_sampler = adc_sampler  # sampled in the background; this only reads its buffer
+
     def battery_total(self):
-        adc = Adc()
-        Power = adc.recvADC(2) * 3
+        Power = self.adc_sampler.median_voltage(2) * 3
         return Power
 
 
 def process_video(default_capabilities, cam):
+    # Stage 1: cam.read() blocks until the camera has a frame, so this runs at the camera's rate
     while True:
         if default_capabilities['input']['camera']['0']['disabled'] is not True:
             ret, raw_frame = cam.read()
-            raw_frame_internal['0'] = raw_frame
-        sleep(0.001)
+            if ret:
+                camera_frames.publish(raw_frame)
+        else:
+            sleep(0.1)
 
 
-def vision_calculation(default_capabilities, previous_frame_data, rgb, capabilities):
+def vision_calculation(default_capabilities, previous_frame_data, rgb, capabilities, report_every=100):
+    # Stage 2: retina work on the newest frame only; frames captured meanwhile are skipped
+    frame_sequence = 0
+    processed = 0
+    skipped = 0
+    vision_time = 0.0
     while True:
-        if raw_frame_internal['0'] != []:
-            raw_frame = raw_frame_internal['0']
-            if len(default_capabilities['input']['camera']['0']['blink']) > 0:
-                raw_frame = default_capabilities['input']['camera']['0']['blink']
-            # Post image into vision
-            previous_frame_data, rgb, default_capabilities = \
-                retina.process_visual_stimuli(raw_frame, default_capabilities,
-                                              previous_frame_data,
-                                              rgb, capabilities)
-            default_capabilities['input']['camera']['0']['blink'] = []
-            # Wrapping camera data into a frame for FEAGI
-        sleep(0.001)
+        sequence, raw_frame = camera_frames.wait_newer(frame_sequence)
+        if sequence == frame_sequence:
+            continue
+        skipped += sequence - frame_sequence - 1
+        frame_sequence = sequence
+        start = time.time()
+        if len(default_capabilities['input']['camera']['0']['blink']) > 0:
+            raw_frame = default_capabilities['input']['camera']['0']['blink']
+        # Post image into vision
+        previous_frame_data, rgb, default_capabilities = \
+            retina.process_visual_stimuli(raw_frame, default_capabilities,
+                                          previous_frame_data,
+                                          rgb, capabilities)
+        default_capabilities['input']['camera']['0']['blink'] = []
+        if rgb:
+            # Merged by copy, since the retina fills the same dicts again on the next frame
+            vision_results.merge(rgb['camera'])
+            for name in rgb['camera']:
+                rgb['camera'][name].clear()
+        vision_time += time.time() - start
+        processed += 1
+        if processed == report_every:
+            print(f"Vision: {vision_time / processed * 1000:.1f} ms per frame, "
+                  f"{skipped} frames skipped while busy")
+            processed = 0
+            skipped = 0
+            vision_time = 0.0
 
 
 def action(obtained_data, led_tracking_list, led,capabilities, motor, servo):
@@ -454,42 +501,15 @@ def action(obtained_data, led_tracking_list, led,capabilities, motor, servo):
     recieved_led_data = actuators.get_led_data(obtained_data)
     if recieved_led_data:
         for data_point in recieved_led_data:
-            led.LED_on(data_point, int((recieved_led_data[data_point] / 100) * 255), 0, 0)
+            led.set(data_point, int((recieved_led_data[data_point] / 100) * 255), 0, 0)
             led_tracking_list[data_point] = True
     else:
         if led_tracking_list:
             for x in led_tracking_list:
-                led.LED_on(x, 0, 0, 0)
+                led.set(x, 0, 0, 0)
             led_tracking_list.clear()
 
 
-async def read_background(feagi_settings):
-    ir = IR()
-    while True:
-        if len(ir_data) > 2:
-            ir_data.popleft()
-        ir_data.append(ir.read())
-        sleep(feagi_settings['feagi_burst_speed'])
-
-
-def start_IR(feagi_settings):
-    asyncio.run(read_background(feagi_settings))
-
-
-async def read_ultrasonic(feagi_settings):
-    ultrasonic = Ultrasonic()
-    while True:
-        if len(ultrasonic_data) > 2:
-            ultrasonic_data.popleft()
-        ultrasonic_data.append(ultrasonic.get_distance())
-        sleep(feagi_settings['feagi_burst_speed'])
-
-
-
-def start_ultrasonic(feagi_settings):
-    asyncio.run(read_ultrasonic(feagi_settings))
-
-
 def check_the_flag(current_path):
     parser = argparse.ArgumentParser(description="Load freenove")
     parser.add_argument('-setup', '--setup', help='first time setup only', required=False)
@@ -556,12 +576,17 @@ def main(current_path):
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # --- Initializer section ---
-    motor = Motor()
+    # Motors and servos share one PCA9685 so a burst's updates can be flushed together
+    pwm = PCA9685(0x40, debug=True)
+    pwm.setPWMFreq(50)
+    motor = Motor(pwm)
     actuators.start_motors(capabilities)  # initialize motors for you.
-    servo = Servo()
+    servo = Servo(pwm, capabilities['output']['servo']['0'].get('deadband', 0.5))
     actuators.start_servos(capabilities)
     led = LED()
-    battery = Battery()  # Commented out, not currently in use
+    adc_interval = capabilities['input']['battery']['0'].get('sample_interval', 1.0)
+    adc_sampler = AdcSampler(Adc(), interval=adc_interval)  # filter tuned to the sampling period
+    battery = Battery(adc_sampler)
 
     # --- Variables ---
     rgb = dict()
@@ -573,9 +598,14 @@ def main(current_path):
     previous_frame_data = {}
     message_to_feagi = {}
 
-    threading.Thread(target=start_IR, args=(feagi_settings,), daemon=True).start()
-    threading.Thread(target=start_ultrasonic, args=(feagi_settings,), daemon=True).start()
-    # ultrasonic = Ultrasonic()
+    # All sensors are sampled in the background; the loop below only reads their latest values
+    ir = IR()  # edge callbacks, nothing to poll
+    ultrasonic = Ultrasonic()
+    sensor_hub = SensorHub()
+    sensor_hub.add('proximity', ultrasonic.read,
+                   capabilities['input']['proximity']['0'].get('ping_interval', 0.06), default=0)
+    sensor_hub.add('adc', adc_sampler.sample, adc_interval)
+    sensor_hub.start()
     motor.stop()
     cam = cv2.VideoCapture(0)  # you need to do sudo rpi-update to be able to use this
     servo.set_default_position(capabilities)
@@ -584,45 +614,53 @@ def main(current_path):
     # overwrite manual
     camera_data = {"vision": {}}
     default_capabilities = pns.create_runtime_default_list(default_capabilities, capabilities)
+    # Capture, vision and the loop below (stage 3) run independently, so motor and IR latency
+    # no longer include the time spent on vision
     threading.Thread(target=process_video, args=(default_capabilities, cam), daemon=True).start()
-    # threading.Thread(target=vision_calculation, args=(default_capabilities, previous_frame_data,
-    #                                                   rgb, capabilities), daemon=True).start()
+    threading.Thread(target=vision_calculation, args=(default_capabilities, previous_frame_data,
+                                                      rgb, capabilities), daemon=True).start()
 
     # router.websocket_client_initalize('192.168.50.218', '9053')
     threading.Thread(target=retina.vision_progress,
                      args=(default_capabilities, feagi_settings, camera_data,), daemon=True).start()
     # threading.Thread(target=router.websocket_recieve, daemon=True).start()
+    bus_time = 0.0
+    bus_bursts = 0
     while True:
         try:
             message_from_feagi = pns.message_from_feagi
             if message_from_feagi and message_from_feagi != None:
                 # Fetch data such as motor, servo, etc and pass to a function (you make ur own action.
                 obtained_signals = pns.obtain_opu_data(message_from_feagi)
-                action(obtained_signals, led_tracking_list, led,capabilities, motor, servo)
-
-            if raw_frame_internal['0'] is not []:
-                raw_frame = raw_frame_internal['0']
-                if len(default_capabilities['input']['camera']['0']['blink']) > 0:
-                    raw_frame = default_capabilities['input']['camera']['0']['blink']
-                # Post image into vision
-                previous_frame_data, rgb, default_capabilities = \
-                    retina.process_visual_stimuli(raw_frame, default_capabilities,
-                                                  previous_frame_data,
-                                                  rgb, capabilities)
-                default_capabilities['input']['camera']['0']['blink'] = []
+                pwm.begin_frame()
+                try:
+                    action(obtained_signals, led_tracking_list, led,capabilities, motor, servo)
+                finally:
+                    # Always end the frame, or the stop() calls below would only be staged
+                    pwm.flush()
+                bus_time += pwm.bus_time
+                bus_bursts += 1
+                if bus_bursts == 100:
+                    print(f"PCA9685: {bus_time / bus_bursts * 1000:.2f} ms of I2C per burst "
+                          f"(last burst: {pwm.transactions} writes, {pwm.skipped} unchanged)")
+                    print(f"Servo writes: {servo.writes} sent, {servo.writes_avoided} avoided; "
+                          f"LED writes: {led.writes} sent, {led.writes_avoided} avoided")
+                    bus_time = 0.0
+                    bus_bursts = 0
+
+            # Attach every change vision found since the last burst; quiet bursts go out without it
+            vision_camera = vision_results.take()
+            if vision_camera:
                 # Wrapping camera data into a frame for FEAGI
-                if rgb:
-                    message_to_feagi = pns.generate_feagi_data(rgb, message_to_feagi)
+                message_to_feagi = pns.generate_feagi_data({'camera': vision_camera}, message_to_feagi)
 
 
+            sensor_snapshot = sensor_hub.snapshot
             # add IR data into feagi data
-            ir_list = ir_data[0] if ir_data else []
+            ir_list = ir.read()
             message_to_feagi = sensors.convert_ir_to_ipu_data(ir_list, len(capabilities['input']['infrared']), message_to_feagi)
             # add ultrasonic data into feagi data
-            if ultrasonic_data:
-                ultrasonic_list = ultrasonic_data[0]
-            else:
-                ultrasonic_list = 0
+            ultrasonic_list = sensor_snapshot['proximity']
             message_to_feagi = sensors.create_data_for_feagi(sensor='proximity', capabilities=capabilities,
                                                              message_to_feagi=message_to_feagi,
                                                              current_data=ultrasonic_list,
@@ -637,10 +675,6 @@ def main(current_path):
             sleep(feagi_settings['feagi_burst_speed'])  # bottleneck
             pns.signals_to_feagi(message_to_feagi, feagi_ipu_channel, agent_settings, feagi_settings)
             message_to_feagi.clear()
-
-            if rgb:
-                for i in rgb['camera']:
-                    rgb['camera'][i].clear()
         except KeyboardInterrupt as ke:  # Keyboard error
             motor.stop()
             cam.release()
@@ -0,0 +1,62 @@
+import time
+import threading
+import RPi.GPIO as GPIO
+
+# ACTIVE_SENSORS[mask] lists the sensors set in mask, so encoding a reading never builds a new list
+ACTIVE_SENSORS = tuple(tuple(index for index in range(3) if mask >> index & 1) for mask in range(8))
+
+
+def ir_message_table(count, sensors=3):
+    # One prebuilt {'ir': {sensor: bool}} per possible bitmask, for callers that index it with
+    # IR.take() instead of rebuilding the dict each tick. Treat the entries as read-only.
+    return tuple({'ir': {sensor: bool(mask >> sensor & 1) for sensor in range(count)}}
+                 for mask in range(1 << sensors))
+
+
+class IR:
+    """
+    Edge-driven line sensors, shared by the smart car and the robot dog. Both edges of every pin raise
+    a callback that updates one integer bitmask (bit n is sensor n) and timestamps the transition.
+    take() also reports sensors that went high since the previous take(), so a line crossed at speed
+    is not missed; a sensor that only turned off is not reported.
+    """
+
+    def __init__(self, pins=(14, 15, 23)):
+        self.bits = {pin: 1 << index for index, pin in enumerate(pins)}
+        self.lock = threading.Lock()
+        self.mask = 0
+        self.rose = 0  # sensors that went high since the last take()
+        self.changed_at = [0.0] * len(pins)  # time.perf_counter() of each sensor's last edge
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+        for pin in pins:
+            GPIO.setup(pin, GPIO.IN)
+            if GPIO.input(pin):
+                self.mask |= self.bits[pin]
+            GPIO.add_event_detect(pin, GPIO.BOTH, callback=self.edge)
+
+    def edge(self, pin):
+        now = time.perf_counter()
+        bit = self.bits[pin]
+        with self.lock:
+            if GPIO.input(pin):
+                self.mask |= bit
+                self.rose |= bit
+            else:
+                self.mask &= ~bit
+            self.changed_at[bit.bit_length() - 1] = now
+
+    def take(self):
+        # Current state plus anything that pulsed high since the last call
+        with self.lock:
+            mask = self.mask | self.rose
+            self.rose = 0
+        return mask
+
+    def transitions(self):
+        # time.perf_counter() of each sensor's last edge, indexed like the bitmask; 0.0 if none yet
+        with self.lock:
+            return tuple(self.changed_at)
+
+    def read(self):
+        return ACTIVE_SENSORS[self.take()]
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SensorHub:
+    """
+    Samples every registered sensor on one asyncio event loop, each at its own interval. Blocking
+    GPIO/I2C reads run in a small thread pool so a slow sensor never delays the others, and the
+    results are published as a snapshot dict that the main loop reads without waiting on hardware.
+    """
+
+    def __init__(self):
+        self.sensors = {}
+        self.snapshot = {}
+
+    def add(self, name, read, interval, default=None):
+        self.sensors[name] = (read, interval)
+        self.snapshot = {**self.snapshot, name: default}
+
+    def get(self, name):
+        return self.snapshot.get(name)
+
+    async def sample(self, executor, name, read, interval):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                value = await loop.run_in_executor(executor, read)
+                # Replace the whole dict so readers always see a complete snapshot
+                self.snapshot = {**self.snapshot, name: value}
+            except Exception as e:
+                print("Sensor", name, "failed:", e)
+            await asyncio.sleep(interval)
+
+    async def run(self):
+        with ThreadPoolExecutor(max_workers=max(1, len(self.sensors))) as executor:
+            await asyncio.gather(*(self.sample(executor, name, read, interval)
+                                   for name, (read, interval) in self.sensors.items()))
+
+    def start(self):
+        threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True).start()
@@ -0,0 +1,46 @@
+# Hand-offs between the camera, vision and control threads of the Freenove controllers.
+import threading
+
+
+class LatestSlot:
+    """
+    Holds only the newest item with a sequence number. Readers wait for a sequence newer than the one
+    they last took, so nothing is processed twice and a slow reader simply skips stale items.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.sequence = 0
+        self.value = None
+
+    def publish(self, value):
+        with self.condition:
+            self.value = value
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def wait_newer(self, sequence, timeout=1.0):
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence != sequence, timeout)
+            return self.sequence, self.value
+
+
+class DeltaSlot:
+    """
+    Accumulates retina deltas ({area: {pixel: value}}) until the reader takes them; a newer value for
+    a pixel replaces the older one, so no change is lost when vision outpaces the reader.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def merge(self, camera):
+        with self.lock:
+            for name, data in camera.items():
+                self.pending.setdefault(name, {}).update(data)
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        return pending
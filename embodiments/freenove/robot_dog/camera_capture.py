@@ -0,0 +1,139 @@
+"""
+Camera backends for the robot dog. Both hand frames to the caller as NumPy arrays with no per-frame
+allocation: Picamera2 yields views straight over the mmap'd DMA buffers of the camera, and the V4L2
+fallback decodes into the same array every time.
+
+Run `python3 camera_capture.py` on the Pi to compare capture + retina FPS against the legacy
+picamera/PiRGBArray path.
+"""
+import time
+import argparse
+
+try:
+    from picamera2 import Picamera2, MappedArray
+except ImportError:  # Buster images and non-Pi machines
+    Picamera2 = None
+
+
+def retina_capture_size(camera, default=(640, 480)):
+    # Smallest frame whose central region still covers central_vision_compression
+    try:
+        width = camera['central_vision_compression'][0] * 100 / camera['retina_width_percent']
+        height = camera['central_vision_compression'][1] * 100 / camera['retina_height_percent']
+    except (KeyError, IndexError, TypeError, ZeroDivisionError):
+        return default
+    # Camera drivers want widths in multiples of 32 and heights in multiples of 16
+    return int(-(-width // 32) * 32), int(-(-height // 16) * 16)
+
+
+class Picamera2Source:
+    def __init__(self, size, buffer_count=4):
+        self.camera = Picamera2()
+        # Picamera2's "RGB888" is stored B, G, R per pixel, which is what the retina expects
+        config = self.camera.create_video_configuration(main={"size": tuple(size), "format": "RGB888"},
+                                                        buffer_count=buffer_count)
+        self.camera.configure(config)
+        self.camera.start()
+
+    def frames(self):
+        while True:
+            request = self.camera.capture_request()
+            try:
+                with MappedArray(request, "main") as mapped:
+                    # Only valid until the next frame is requested; copy anything that must outlive it
+                    yield mapped.array
+            finally:
+                request.release()
+
+    def close(self):
+        self.camera.stop()
+        self.camera.close()
+
+
+class V4L2Source:
+    def __init__(self, size, device=0):
+        import cv2
+        self.cap = cv2.VideoCapture(device, cv2.CAP_V4L2)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.frame = None
+
+    def frames(self):
+        while True:
+            check, frame = self.cap.read(self.frame)  # reuses self.frame once it exists
+            if not check:
+                time.sleep(0.01)
+                continue
+            self.frame = frame
+            yield frame
+
+    def close(self):
+        self.cap.release()
+
+
+def open_camera(size):
+    if Picamera2 is not None:
+        try:
+            source = Picamera2Source(size)
+            print("Camera: Picamera2 at", size)
+            return source
+        except Exception as e:
+            print("Picamera2 unavailable, falling back to V4L2:", e)
+    print("Camera: V4L2 at", size)
+    return V4L2Source(size)
+
+
+def benchmark_legacy(camera_capabilities, frames):
+    # The path controller.py used before: 640x480 PiRGBArray, then lists per region
+    from picamera import PiCamera
+    from picamera.array import PiRGBArray
+    from feagi_connector import retina
+    camera = PiCamera()
+    camera.resolution = (640, 480)
+    camera.framerate = 32
+    raw_capture = PiRGBArray(camera, size=(640, 480))
+    previous = {}
+    start = time.time()
+    for count, frame in enumerate(camera.capture_continuous(raw_capture, format="bgr", use_video_port=True)):
+        image = frame.array
+        raw_capture.truncate(0)
+        retina_data = retina.frame_split(frame=image, width_percent=camera_capabilities['retina_width_percent'],
+                                         height_percent=camera_capabilities['retina_height_percent'],
+                                         camera_index=camera_capabilities['index'])
+        for name in retina_data:
+            size = camera_capabilities['central_vision_compression' if '_C' in name else
+                                       'peripheral_vision_compression']
+            data = retina.ndarray_to_list(retina.center_data_compression(retina_data[name], size))
+            _, previous[name] = retina.get_rgb(data, size, previous.get(name, {}), name,
+                                               camera_capabilities['deviation_threshold'])
+        if count + 1 == frames:
+            break
+    elapsed = time.time() - start
+    camera.close()
+    return frames / elapsed
+
+
+def benchmark(camera_capabilities, frames):
+    from vision import RegionProcessor
+    camera = open_camera(retina_capture_size(camera_capabilities))
+    processor = RegionProcessor(camera_capabilities)
+    start = time.time()
+    for count, image in enumerate(camera.frames()):
+        processor.process(image)
+        if count + 1 == frames:
+            break
+    elapsed = time.time() - start
+    camera.close()
+    return frames / elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Capture + retina FPS, legacy path against the new backend')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--skip_legacy', action='store_true')
+    args = parser.parse_args()
+    from configuration import capabilities
+    if not args.skip_legacy:
+        print(f"legacy picamera + lists: {benchmark_legacy(capabilities['camera'], args.frames):.1f} FPS")
+    print(f"mmap capture + numpy:    {benchmark(capabilities['camera'], args.frames):.1f} FPS")
@@ -1,18 +1,23 @@
 from feagi_connector import feagi_interface as FEAGI
 import RPi.GPIO as GPIO
-from feagi_connector import retina as retina
 import configuration
+import time
 import traceback
 import requests
+import threading
 import sys
 from Led import *
 from PCA9685 import PCA9685
 import Adafruit_PCA9685
 from configuration import *
-from picamera import PiCamera
+from camera_capture import open_camera, retina_capture_size
+from vision import RegionProcessor
+from feagi_connector_freenove.ir_sensor import IR, ir_message_table
+from feagi_connector_freenove.slots import DeltaSlot
 from datetime import datetime
 from collections import deque
-from picamera.array import PiRGBArray
+
+CONTROL_RATE = 30  # Hz; close to the old camera-paced rate of 32 FPS
 
 
 runtime_data = {
@@ -25,13 +30,74 @@ runtime_data = {
     'servo_status': {}
 }
 
-previous_data_frame = dict()
-
 
 def window_average(sequence):
     return sum(sequence) // len(sequence)
 
 
+class FeagiLink:
+    """
+    Keeps FEAGI I/O out of the control loop. One thread subscribes to the OPU and keeps only the latest
+    message, another polls the burst engine over a persistent HTTP session every poll_interval seconds.
+    """
+
+    def __init__(self, opu_channel_address, api_address, poll_interval=5.0):
+        self.opu_channel_address = opu_channel_address
+        self.opu_channel = FEAGI.sub_initializer(opu_address=opu_channel_address)
+        self.stimulation_period_url = api_address + FEAGI.feagi_api_burst_engine()
+        self.burst_counter_url = api_address + FEAGI.feagi_api_burst_counter()
+        self.poll_interval = poll_interval
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.message = None
+        self.resubscribe = False  # set by the poller, acted on by the receiver that owns the socket
+        self.sent = 0  # messages sent to FEAGI, compared with its burst counter
+
+    def take_message(self):
+        with self.lock:
+            message, self.message = self.message, None
+        return message
+
+    def receive(self):
+        while True:
+            if self.resubscribe:
+                # zmq sockets are not thread-safe, so the old one is closed here rather than by the poller
+                self.resubscribe = False
+                self.opu_channel.socket.close(linger=0)
+                self.opu_channel = FEAGI.sub_initializer(opu_address=self.opu_channel_address)
+            message = self.opu_channel.receive()
+            if message is None:
+                time.sleep(0.001)
+                continue
+            with self.lock:
+                self.message = message  # an unread older message is replaced
+
+    def poll_burst_engine(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                feagi_burst_speed = self.session.get(self.stimulation_period_url, timeout=2).json()
+                feagi_burst_counter = self.session.get(self.burst_counter_url, timeout=2).json()
+            except (requests.RequestException, ValueError) as e:
+                print("Burst engine poll failed:", e)
+                continue
+            if feagi_burst_speed != network_settings['feagi_burst_speed']:
+                network_settings['feagi_burst_speed'] = feagi_burst_speed
+            if self.sent < feagi_burst_counter:
+                # FEAGI restarted or we fell behind; resubscribe so stale messages are not replayed
+                self.resubscribe = True
+
+    def start(self):
+        threading.Thread(target=self.receive, daemon=True).start()
+        threading.Thread(target=self.poll_burst_engine, daemon=True).start()
+
+
+def process_camera(camera, region_processor, vision):
+    for image in camera.frames():
+        if capabilities['camera']['disabled'] is not True:
+            vision.merge(region_processor.process(image)['camera'])
+
+
 class LED:
     def __init__(self):
         self.led = Led()
@@ -401,26 +467,6 @@ class Motor:
             return abs(power)
 
 
-class IR:
-    def __init__(self):
-        self.IR01 = 14
-        self.IR02 = 15
-        self.IR03 = 23
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setwarnings(False)
-        GPIO.setup(self.IR01, GPIO.IN)
-        GPIO.setup(self.IR02, GPIO.IN)
-        GPIO.setup(self.IR03, GPIO.IN)
-
-    def read(self):
-        gpio_state = []
-        ir_sensors = [self.IR01, self.IR02, self.IR03]
-        for idx, sensor in enumerate(ir_sensors):
-            if GPIO.input(sensor):
-                gpio_state.append(idx)
-        return gpio_state
-
-
 class Ultrasonic:
     def __init__(self):
         GPIO.setwarnings(False)
@@ -474,10 +520,8 @@ def main():
     opu_channel_address = FEAGI.feagi_outbound(network_settings['feagi_host'],
                                                runtime_data["feagi_state"]['feagi_opu_port'])
     feagi_ipu_channel = FEAGI.pub_initializer(ipu_channel_address)
-    feagi_opu_channel = FEAGI.sub_initializer(opu_address=opu_channel_address)
     api_address = FEAGI.feagi_gui_address(feagi_host, api_port)
-    stimulation_period_endpoint = FEAGI.feagi_api_burst_engine()
-    burst_counter_endpoint = FEAGI.feagi_api_burst_counter()
+    feagi_link = FeagiLink(opu_channel_address, api_address)
     network_settings['feagi_burst_speed'] = float(runtime_data["feagi_state"]['burst_duration'])
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - #
 
@@ -485,16 +529,14 @@ def main():
     #                            Initializer section
     motor = Motor()
     servo = Servo()
-    ir = IR()
+    ir = IR()  # edge callbacks keep ir.mask current
+    ir_messages = ir_message_table(int(configuration.capabilities['infrared']['count']))
     ultrasonic = Ultrasonic()
     # battery = Battery()
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - #
 
-    flag = False
-    keyboard_flag = True
     rolling_window_len = configuration.capabilities['motor']['rolling_window_len']
     motor_count = configuration.capabilities['motor']['count']
-    msg_counter = 0
     # rpm = (50 * 60) / 2
     # DC motor has 2 poles, 50 is the freq and it's constant (why??) and 60 is the
     # seconds of a minute
@@ -506,146 +548,82 @@ def main():
     rolling_window = {}
     for motor_id in range(motor_count):
         rolling_window[motor_id] = deque([0] * rolling_window_len)
-    camera = PiCamera()
-    camera.resolution = (640, 480)
-    camera.framerate = 32
-    rawCapture = PiRGBArray(camera, size=(640, 480))
+    # Capture at the smallest size the retina can use; frames arrive as NumPy views, no copies
+    camera = open_camera(retina_capture_size(capabilities['camera']))
+    region_processor = RegionProcessor(capabilities['camera'])
+    vision = DeltaSlot()
+    threading.Thread(target=process_camera, args=(camera, region_processor, vision), daemon=True).start()
+    feagi_link.start()
     motor.stop()
+
+    # Control runs on its own clock; camera frames, OPU messages and burst polling arrive in the background
+    control_period = 1.0 / CONTROL_RATE
+    next_tick = time.time()
     while True:
         try:
-            for frame in camera.capture_continuous(rawCapture, format="bgr", use_video_port=True):
-                if keyboard_flag:
-                    image = frame.array
-                    rawCapture.truncate(0)
-                    if capabilities['camera']['disabled'] is not True:
-                        retina_data = \
-                            retina.frame_split(frame=image,
-                                               width_percent=configuration.capabilities['camera']
-                                               ['retina_width_percent'],
-                                               height_percent=configuration.capabilities['camera']
-                                               ['retina_height_percent'],
-                                               camera_index=configuration.capabilities['camera']
-                                               ['index'])
-                        for i in retina_data:
-                            if '_C' in i:
-                                retina_data[i] = retina.center_data_compression(retina_data[i],
-                                                                                capabilities['camera'][
-                                                                                    "central_vision_compression"]
-                                                                                )
-                            else:
-                                retina_data[i] = retina.center_data_compression(retina_data[i],
-                                                                                capabilities['camera']
-                                                                                ['peripheral_vision_compression'])
-                        rgb = dict()
-                        rgb['camera'] = dict()
-                        if previous_data_frame == {}:
-                            for i in retina_data:
-                                previous_name = str(i) + "_prev"
-                                previous_data_frame[previous_name] = {}
-                        for i in retina_data:
-                            name = i
-                            if 'prev' not in i:
-                                data = retina.ndarray_to_list(retina_data[i])
-                                if '_C' in i:
-                                    previous_name = str(i) + "_prev"
-                                    rgb_data, previous_data_frame[previous_name] = \
-                                        retina.get_rgb(data,
-                                                       capabilities[
-                                                           'camera'][
-                                                           'central_vision_compression'],
-                                                       previous_data_frame[
-                                                           previous_name],
-                                                       name,
-                                                       capabilities['camera']['deviation_threshold'])
-                                else:
-                                    previous_name = str(i) + "_prev"
-                                    rgb_data, previous_data_frame[previous_name] = \
-                                        retina.get_rgb(data, capabilities['camera']['peripheral_vision_compression'],
-                                                       previous_data_frame[previous_name], name,
-                                                       capabilities['camera']['deviation_threshold'])
-                                for a in rgb_data['camera']:
-                                    rgb['camera'][a] = rgb_data['camera'][a]
-                    else:
-                        rgb = {}
-                ir_data = ir.read()
-                if ir_data:
-                    formatted_ir_data = {'ir': {sensor: True for sensor in ir_data}}
-                else:
-                    formatted_ir_data = {}
-
-                if ir_data:
-                    for ir_sensor in range(int(configuration.capabilities['infrared']['count'])):
-                        if ir_sensor not in formatted_ir_data['ir']:
-                            formatted_ir_data['ir'][ir_sensor] = False
-                else:
-                    formatted_ir_data['ir'] = {}
-                    for ir_sensor in range(int(configuration.capabilities['infrared']['count'])):
-                        formatted_ir_data['ir'][ir_sensor] = False
-
-                for ir_sensor in range(int(configuration.capabilities['infrared']['count'])):
-                    if ir_sensor not in formatted_ir_data['ir']:
-                        formatted_ir_data['ir'][ir_sensor] = False
-                ultrasonic_data = ultrasonic.get_distance()
-                if ultrasonic_data:
-                    formatted_ultrasonic_data = {
-                        'ultrasonic': {
-                            sensor: data for sensor, data in enumerate([ultrasonic_data])
-                        }
+            # Every change since the last tick; the processor has already moved its baseline past them
+            camera_deltas = vision.take()
+            rgb = {'camera': camera_deltas} if camera_deltas else {}
+            formatted_ir_data = ir_messages[ir.take()]
+            ultrasonic_data = ultrasonic.get_distance()
+            if ultrasonic_data:
+                formatted_ultrasonic_data = {
+                    'ultrasonic': {
+                        sensor: data for sensor, data in enumerate([ultrasonic_data])
                     }
-                else:
-                    formatted_ultrasonic_data = {}
-                configuration.message_to_feagi, battery = FEAGI.compose_message_to_feagi(
-                    original_message={**formatted_ir_data, **formatted_ultrasonic_data,
-                                      **rgb})  # Removed battery due to error
-                # Process OPU data received from FEAGI and pass it along
-                message_from_feagi = feagi_opu_channel.receive()
-                if message_from_feagi is not None:
-                    opu_data = FEAGI.opu_processor(message_from_feagi)
-                    if capabilities['motor']['disabled'] is not True:
-                        if 'motor' in opu_data:
-                            if opu_data['motor'] is not {}:
-                                for data_point in opu_data['motor']:
-                                    device_power = opu_data['motor'][data_point]
-                                    device_power = motor.power_convert(data_point, device_power)
-                                    device_id = motor.motor_converter(data_point)
-                                    if device_id not in motor_data:
-                                        motor_data[device_id] = dict()
-                                    rolling_window[device_id].append(device_power)
-                                    rolling_window[device_id].popleft()
-                                else:
-                                    # print("zero time")
-                                    for _ in range(motor_count):
-                                        rolling_window[_].append(0)
-                                        rolling_window[_].popleft()
-                    if capabilities['servo']['disabled'] is not True:
-                        if 'servo' in opu_data:
-                            for data_point in opu_data['servo']:
-                                device_id = data_point
-                                device_power = opu_data['servo'][data_point]
-                                servo.move(feagi_device_id=device_id, power=device_power)
-                configuration.message_to_feagi['timestamp'] = datetime.now()
-                configuration.message_to_feagi['counter'] = msg_counter
-                feagi_ipu_channel.send(configuration.message_to_feagi)
-                configuration.message_to_feagi.clear()
-                msg_counter += 1
-                flag += 1
-                if flag == 10:
-                    feagi_burst_speed = requests.get(api_address + stimulation_period_endpoint).json()
-                    feagi_burst_counter = requests.get(api_address + burst_counter_endpoint).json()
-                    flag = 0
-                    if msg_counter < feagi_burst_counter:
-                        feagi_opu_channel = FEAGI.sub_initializer(opu_address=opu_channel_address)
-                        if feagi_burst_speed != network_settings['feagi_burst_speed']:
-                            network_settings['feagi_burst_speed'] = feagi_burst_speed
-                for id in range(motor_count):
-                    motor_power = window_average(rolling_window[id])
-                    motor_power = motor_power * 1100
-                    motor.move(id, motor_power)
+                }
+            else:
+                formatted_ultrasonic_data = {}
+            configuration.message_to_feagi, battery = FEAGI.compose_message_to_feagi(
+                original_message={**formatted_ir_data, **formatted_ultrasonic_data,
+                                  **rgb})  # Removed battery due to error
+            # Process the latest OPU data received from FEAGI and pass it along
+            message_from_feagi = feagi_link.take_message()
+            if message_from_feagi is not None:
+                opu_data = FEAGI.opu_processor(message_from_feagi)
+                if capabilities['motor']['disabled'] is not True:
+                    if 'motor' in opu_data:
+                        if opu_data['motor'] is not {}:
+                            for data_point in opu_data['motor']:
+                                device_power = opu_data['motor'][data_point]
+                                device_power = motor.power_convert(data_point, device_power)
+                                device_id = motor.motor_converter(data_point)
+                                if device_id not in motor_data:
+                                    motor_data[device_id] = dict()
+                                rolling_window[device_id].append(device_power)
+                                rolling_window[device_id].popleft()
+                            else:
+                                # print("zero time")
+                                for _ in range(motor_count):
+                                    rolling_window[_].append(0)
+                                    rolling_window[_].popleft()
+                if capabilities['servo']['disabled'] is not True:
+                    if 'servo' in opu_data:
+                        for data_point in opu_data['servo']:
+                            device_id = data_point
+                            device_power = opu_data['servo'][data_point]
+                            servo.move(feagi_device_id=device_id, power=device_power)
+            configuration.message_to_feagi['timestamp'] = datetime.now()
+            configuration.message_to_feagi['counter'] = feagi_link.sent
+            feagi_ipu_channel.send(configuration.message_to_feagi)
+            configuration.message_to_feagi.clear()
+            feagi_link.sent += 1
+            for id in range(motor_count):
+                motor_power = window_average(rolling_window[id])
+                motor_power = motor_power * 1100
+                motor.move(id, motor_power)
+
+            next_tick += control_period
+            delay = next_tick - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -control_period:
+                next_tick = time.time()  # fell behind; start again instead of bursting to catch up
         except KeyboardInterrupt as ke:  # Keyboard error
             motor.stop()
-            keyboard_flag = False
+            camera.close()
             print(ke)
-
+            break
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,74 @@
+"""
+NumPy version of the retina steps the robot dog used (frame_split, center_data_compression,
+ndarray_to_list, get_rgb). Regions are slices of the captured frame, compression writes into buffers
+kept per region, and only pixels that changed beyond deviation_threshold are turned into the
+{"x-y-c": value} entries FEAGI expects.
+"""
+import cv2
+import numpy as np
+
+REGION_NAMES = (('TL', 'TM', 'TR'),
+                ('ML', 'C', 'MR'),
+                ('LL', 'LM', 'LR'))
+
+
+def region_slices(shape, width_percent, height_percent):
+    # The center region covers width_percent x height_percent of the frame; the rest forms a 3x3 grid
+    height, width = shape[:2]
+    center_width = width * width_percent // 100
+    center_height = height * height_percent // 100
+    x0 = (width - center_width) // 2
+    y0 = (height - center_height) // 2
+    xs = (0, x0, x0 + center_width, width)
+    ys = (0, y0, y0 + center_height, height)
+    return {REGION_NAMES[row][column]: (slice(ys[row], ys[row + 1]), slice(xs[column], xs[column + 1]))
+            for row in range(3) for column in range(3)}
+
+
+class RegionProcessor:
+    def __init__(self, camera):
+        self.camera = camera
+        self.index = camera['index']
+        threshold = camera['deviation_threshold']
+        # Older configs give the threshold as a fraction of full scale
+        self.threshold = threshold * 255 if threshold < 1 else threshold
+        self.shape = None
+        self.slices = {}
+        self.compressed = {}
+        self.previous = {}
+
+    def setup(self, shape):
+        self.shape = shape
+        self.slices = region_slices(shape, self.camera['retina_width_percent'],
+                                    self.camera['retina_height_percent'])
+        self.compressed = {}
+        self.previous = {}
+        for region in self.slices:
+            width, height = self.camera['central_vision_compression' if region == 'C' else
+                                        'peripheral_vision_compression']
+            self.compressed[region] = np.empty((height, width) + shape[2:], dtype=np.uint8)
+
+    def changes(self, region, compressed):
+        previous = self.previous.get(region)
+        current = compressed.astype(np.int16)
+        if previous is None:
+            changed = np.ones(compressed.shape, dtype=bool)
+        else:
+            changed = np.abs(current - previous) > self.threshold
+        self.previous[region] = current
+        rows, columns, channels = np.nonzero(changed)
+        values = compressed[rows, columns, channels]
+        # FEAGI's y axis starts at the bottom of the image
+        rows = compressed.shape[0] - 1 - rows
+        return {f"{x}-{y}-{c}": value for x, y, c, value in
+                zip(columns.tolist(), rows.tolist(), channels.tolist(), values.tolist())}
+
+    def process(self, frame):
+        if frame.shape != self.shape:
+            self.setup(frame.shape)
+        rgb = {'camera': {}}
+        for region, (rows, columns) in self.slices.items():
+            compressed = self.compressed[region]
+            cv2.resize(frame[rows, columns], compressed.shape[1::-1], dst=compressed, interpolation=cv2.INTER_AREA)
+            rgb['camera'][f"{self.index}_{region}"] = self.changes(region, compressed)
+        return rgb
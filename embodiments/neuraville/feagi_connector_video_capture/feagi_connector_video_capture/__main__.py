@@ -16,6 +16,13 @@ if __name__ == '__main__':
                         required=False)
     parser.add_argument('-video', '--video', help='Use the path to video to read', required=False)
     parser.add_argument('-image', '--image', help='Use the path to image to read', required=False)
+    parser.add_argument('-stream', '--stream', help='Use an RTSP or HTTP (MJPEG) stream URL', required=False)
+    parser.add_argument('-record', '--record', help='Record raw camera frames to this file', required=False)
+    parser.add_argument('-replay', '--replay', help='Replay a recording instead of the cameras', required=False)
+    parser.add_argument('-replay_fast', '--replay_fast', action='store_true', default=None,
+                        help='Replay as fast as possible instead of at the recorded timing')
+    parser.add_argument('-offline', '--offline', action='store_true', default=None,
+                        help='With --replay: run one pass without FEAGI, for reproducible benchmarks')
     parser.add_argument('-port', '--port', help='Change the port instead of default 8000.',
                         required=False)
     parser.add_argument('-magic_link', '--magic_link', help='Get the magic link from NRS button',
@@ -45,11 +52,19 @@ if __name__ == '__main__':
                 capabilities['input']['camera']['0']["video_device_index"] = [int(device_list[0])]
     if args['video']:
         capabilities['input']['camera']['0']["video_device_index"] = args['video']
+    if args['stream']:
+        capabilities['input']['camera']['0']["video_device_index"] = args['stream']
+    if args['record']:
+        capabilities['input']['camera']['0']["record_path"] = args['record']
+    if args['replay']:
+        capabilities['input']['camera']['0']["replay_path"] = args['replay']
+        capabilities['input']['camera']['0']["replay_realtime"] = not args['replay_fast']
+        capabilities['input']['camera']['0']["offline"] = bool(args['offline'])
     if args['port']:
         feagi_settings["feagi_api_port"] = args['port']
     if args['image']:
         capabilities['input']['camera']['0']["image"] = args['image']
-    if feagi_settings['feagi_url'] or args['magic_link']:
+    if (feagi_settings['feagi_url'] or args['magic_link']) and not args['offline']:
         if args['magic_link']:
             for arg in args:
                 if args[arg] is not None:
@@ -76,6 +91,8 @@ if __name__ == '__main__':
             print("FEAGI AUTH URL ------- ", feagi_auth_url)
             video_controller.main(feagi_auth_url, feagi_settings, agent_settings,
                                   capabilities, message_to_feagi)
+            if args['offline']:
+                break  # one pass over the recording, then exit
         except Exception as e:
             feagi_settings = inital_feagi_setting.copy()
             agent_settings = inital_agent_settings.copy()
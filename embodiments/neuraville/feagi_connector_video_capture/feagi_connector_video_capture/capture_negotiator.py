@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright 2016-present Neuraville Inc. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================
+"""
+
+import re
+import cv2
+import shutil
+import subprocess
+from time import time
+
+PREFERRED_FORMATS = ["MJPG", "YUYV"]
+# Probed with cap.set when v4l2-ctl is not available (Windows, macOS or a minimal Pi image)
+COMMON_RESOLUTIONS = [(160, 120), (176, 144), (320, 240), (352, 288), (640, 360), (640, 480),
+                      (800, 600), (1280, 720), (1920, 1080)]
+
+
+def retina_resolution(full_list_dimension):
+    # Largest width/height of any vision cortical area, e.g. {'iv00_C': {'cortical_dimensions': [128, 128, 1]}}
+    width = height = 0
+    for cortical_id, details in (full_list_dimension or {}).items():
+        if str(cortical_id).startswith("iv") and isinstance(details, dict):
+            dimensions = details.get("cortical_dimensions") or []
+            if len(dimensions) >= 2:
+                width = max(width, int(dimensions[0]))
+                height = max(height, int(dimensions[1]))
+    if width and height:
+        return width, height
+    return None
+
+
+def list_v4l2_modes(device):
+    # Returns [(fourcc, width, height), ...] parsed from v4l2-ctl, or [] if it is unavailable
+    if not shutil.which("v4l2-ctl"):
+        return []
+    path = device if isinstance(device, str) else "/dev/video" + str(device)
+    try:
+        output = subprocess.run(["v4l2-ctl", "-d", path, "--list-formats-ext"], capture_output=True,
+                                text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    modes = []
+    fourcc = None
+    for line in output.splitlines():
+        found_format = re.search(r"\[\d+\]: '(\w+)'", line)
+        if found_format:
+            fourcc = found_format.group(1)
+            continue
+        found_size = re.search(r"Size: Discrete (\d+)x(\d+)", line)
+        if found_size and fourcc:
+            modes.append((fourcc, int(found_size.group(1)), int(found_size.group(2))))
+    return modes
+
+
+def set_mode(cap, fourcc, width, height):
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    return int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+
+def probe_modes(cap):
+    # Ask the driver for each common size and keep the ones it actually accepts
+    modes = []
+    for fourcc in PREFERRED_FORMATS:
+        for width, height in COMMON_RESOLUTIONS:
+            if set_mode(cap, fourcc, width, height) == (width, height):
+                modes.append((fourcc, width, height))
+    return modes
+
+
+def measure_fps(cap, frames=15):
+    cap.read()  # the first read after a mode change includes stream start-up
+    start = time()
+    read = 0
+    for _ in range(frames):
+        check, _ = cap.read()
+        if check:
+            read += 1
+    elapsed = time() - start
+    return read / elapsed if elapsed > 0 else 0.0
+
+
+def negotiate(cap, device, target_size):
+    """
+    Picks the smallest camera mode that still covers target_size, preferring whichever of MJPEG or
+    YUYV reads faster at that size. Logs the chosen mode and measured FPS. Returns the mode or None.
+    """
+    if not target_size or not cap.isOpened():
+        return None
+    modes = list_v4l2_modes(device) or probe_modes(cap)
+    covering = [mode for mode in modes if mode[0] in PREFERRED_FORMATS
+                and mode[1] >= target_size[0] and mode[2] >= target_size[1]]
+    if not covering:
+        print("Camera", device, "has no mode covering", target_size, "- keeping the default mode")
+        return None
+    smallest = min(mode[1] * mode[2] for mode in covering)
+    candidates = [mode for mode in covering if mode[1] * mode[2] == smallest]
+
+    best_mode = None
+    best_fps = -1.0
+    for fourcc, width, height in candidates:
+        set_mode(cap, fourcc, width, height)
+        fps = measure_fps(cap)
+        if fps > best_fps:
+            best_mode, best_fps = (fourcc, width, height), fps
+    if best_mode != candidates[-1]:
+        set_mode(cap, *best_mode)
+    print(f"Camera {device}: {best_mode[0]} {best_mode[1]}x{best_mode[2]} at {best_fps:.1f} FPS "
+          f"(retina needs {target_size[0]}x{target_size[1]})")
+    return best_mode
@@ -19,14 +19,19 @@ limitations under the License.
 
 import cv2
 import requests
-from time import sleep
+from time import sleep, time
 from datetime import datetime
 from feagi_connector import pns_gateway as pns
 from feagi_connector.version import __version__
 from feagi_connector import retina as retina
 from feagi_connector import feagi_interface as feagi
+from feagi_connector_video_capture.motion_gate import MotionGate
+from feagi_connector_video_capture import capture_negotiator
+from feagi_connector_video_capture.preprocessing import FramePreprocessor, gamma_table
+from feagi_connector_video_capture.network_stream import NetworkStream, is_stream_url
 import traceback
 import threading
+import atexit
 import os
 import screeninfo
 import mss
@@ -35,15 +40,41 @@ import numpy
 camera_data = {"vision": []}
 
 
-def process_video(video_path, capabilities):
+def make_preprocessors(capabilities):
+    # One preprocessing pipeline per camera entry; device n uses the n-th entry (or camera 0)
+    return [FramePreprocessor(capabilities['input']['camera'][index])
+            for index in capabilities['input']['camera']]
+
+
+def preprocess(preprocessors, device, frame):
+    return preprocessors[device if device < len(preprocessors) else 0].apply(frame)
+
+
+def process_video(video_path, capabilities, capture_size=None):
     webcam_list = list()
     webcam_data_each = dict()
+    preprocessors = make_preprocessors(capabilities)
+    camera_settings = capabilities['input']['camera']['0']
+    recorder = None
+    if camera_settings.get('record_path'):
+        # stream_recorder needs lz4, so it is only imported when recording or replaying
+        from feagi_connector_video_capture.stream_recorder import StreamRecorder
+        # The cortical dimensions let the recording be replayed with --offline, without FEAGI
+        recorder = StreamRecorder(camera_settings['record_path'],
+                                  {"full_list_dimension": pns.full_list_dimension,
+                                   "resize_list": pns.resize_list})
+        atexit.register(recorder.close)
     if capabilities['input']['camera']['0']["image"] == "":
         for device in video_path:
+            if is_stream_url(device):
+                # IP cameras decode on their own thread and only hand over the newest frame
+                webcam_list.append(NetworkStream(device))
+                continue
             new_cam = cv2.VideoCapture(device)
+            if isinstance(device, int):
+                # Capture close to the retina's resolution instead of the full sensor size
+                capture_negotiator.negotiate(new_cam, device, capture_size)
             webcam_list.append(new_cam)
-    # cam.set(3, 320)
-    # cam.set(4, 240)
     if capabilities['input']['camera']['0']['video_device_index'] == "monitor":
         all_monitors = screeninfo.get_monitors()  # Needs to create an IPU for this
     pixels = []
@@ -59,10 +90,14 @@ def process_video(video_path, capabilities):
                     # pixels = adjust_gamma(pixels)
             else:
                 number_of_device = 0
+                raw_frames = {}
                 for i in webcam_list:
                     check, new_data = i.read()
-                    webcam_data_each[number_of_device] = new_data
+                    raw_frames[number_of_device] = new_data
+                    webcam_data_each[number_of_device] = preprocess(preprocessors, number_of_device, new_data)
                     number_of_device += 1
+                if recorder:
+                    recorder.add(raw_frames)
                 # else:
                 #     check, pixels = cam.read()
         else:
@@ -84,15 +119,8 @@ def process_video(video_path, capabilities):
 
                 img = numpy.array(sct.grab(monitor))
                 pixels = cv2.cvtColor(img, cv2.COLOR_RGBA2RGB)
-            if capabilities['input']['camera']['0']["mirror"]:
-                pixels = cv2.flip(pixels, 1)
-            camera_data["vision"] = pixels
+            camera_data["vision"] = preprocessors[0].apply(pixels)
         else:
-            for index in capabilities['input']['camera']:
-                if capabilities['input']['camera'][index]["mirror"]:
-                    if webcam_data_each:
-                        for device in webcam_data_each:
-                            webcam_data_each[device] = cv2.flip(webcam_data_each[device], 1)
             if webcam_data_each:
                 camera_data["vision"] = webcam_data_each.copy()
             # print(camera_data)
@@ -101,18 +129,14 @@ def process_video(video_path, capabilities):
 
 
 def adjust_gamma(image, gamma=5.0):
-    invGamma = 1.0 / gamma
-    table = numpy.array([((i / 255.0) ** invGamma) * 255
-                         for i in numpy.arange(0, 256)]).astype("uint8")
-    # apply gamma correction using the lookup table
-    return cv2.LUT(image, table)
+    # apply gamma correction using the cached lookup table
+    return cv2.LUT(image, gamma_table(gamma))
 
 
 def main(feagi_auth_url, feagi_settings, agent_settings, capabilities, message_to_feagi):
     webcam_list = []
     for index in capabilities['input']['camera']:
         webcam_list.append(capabilities['input']['camera'][index]['video_device_index'])
-    threading.Thread(target=process_video, args=(webcam_list, capabilities), daemon=True).start()
     # Generate runtime dictionary
     runtime_data = {"vision": {}, "current_burst_id": None, "stimulation_period": None,
                     "feagi_state": None,
@@ -129,14 +153,39 @@ def main(feagi_auth_url, feagi_settings, agent_settings, capabilities, message_t
     #     print("retrying...")
     #     sleep(2)
     # print("FEAGI is reachable!")
-    # # # FEAGI registration # # # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-    # FEAGI registration - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-    feagi_settings, runtime_data, api_address, feagi_ipu_channel, feagi_opu_channel = (
-        feagi.connect_to_feagi(
-            feagi_settings, runtime_data, agent_settings, capabilities, __version__
+    camera_settings = capabilities['input']['camera']['0']
+    replayer = None
+    if camera_settings.get('replay_path'):
+        from feagi_connector_video_capture.stream_recorder import StreamReplayer
+        # An offline replay makes one pass, so repeated runs process exactly the same frames
+        replayer = StreamReplayer(camera_settings['replay_path'], camera_settings.get('replay_realtime', True),
+                                  loop=not camera_settings.get('offline'))
+    offline = replayer is not None and bool(camera_settings.get('offline'))
+    if offline:
+        # No FEAGI: cortical dimensions come from the recording and sends go nowhere
+        runtime_data["feagi_state"] = {"burst_counter": 0}
+        feagi_ipu_channel = None
+        pns.full_list_dimension = replayer.header.get("full_list_dimension") or {}
+        pns.resize_list.update(replayer.header.get("resize_list") or {})
+        pns.signals_to_feagi = lambda *args, **kwargs: None
+    else:
+        # # # FEAGI registration # # # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        # FEAGI registration - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        feagi_settings, runtime_data, api_address, feagi_ipu_channel, feagi_opu_channel = (
+            feagi.connect_to_feagi(
+                feagi_settings, runtime_data, agent_settings, capabilities, __version__
+            )
         )
-    )
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    if not replayer:
+        # Cameras open after registration so the capture mode can match FEAGI's vision cortical areas
+        capture_size = camera_settings.get('capture_resolution')
+        if not pns.full_list_dimension and (not capture_size or camera_settings.get('record_path')):
+            pns.full_list_dimension = pns.fetch_full_dimensions()
+        if not capture_size:
+            capture_size = capture_negotiator.retina_resolution(pns.full_list_dimension)
+        threading.Thread(target=process_video, args=(webcam_list, capabilities, capture_size), daemon=True).start()
+    preprocessors = make_preprocessors(capabilities)
     msg_counter = runtime_data["feagi_state"]['burst_counter']
     rgb = dict()
     rgb['camera'] = dict()
@@ -146,21 +195,56 @@ def main(feagi_auth_url, feagi_settings, agent_settings, capabilities, message_t
     # overwrite manual
     default_capabilities = pns.create_runtime_default_list(default_capabilities, capabilities)
     # default_capabilities = retina.convert_new_json_to_old_json(default_capabilities)  # temporary
-    threading.Thread(target=retina.vision_progress, args=(default_capabilities, feagi_settings, camera_data['vision'],), daemon=True).start()
+    if not offline:
+        threading.Thread(target=retina.vision_progress, args=(default_capabilities, feagi_settings, camera_data['vision'],), daemon=True).start()
+    motion_gate = MotionGate(camera_settings.get('motion_threshold', 0),
+                             camera_settings.get('motion_hysteresis', 0.5),
+                             camera_settings.get('motion_keyframe_interval', 30))
+    # Retina throughput is reported while replaying a recording, for comparing runs
+    benchmark = replayer is not None
+    retina_frames = 0
+    retina_seconds = 0.0
+    total_frames = 0
+    total_seconds = 0.0
+    last_report = time()
     while True:
         try:
-            if len(camera_data['vision']) > 0:
+            if replayer:
+                # Every recorded frame reaches the retina once, in order, paced by the replayer
+                check, raw_frames = replayer.read()
+                if not check:
+                    print(f"Replay finished: {total_frames} frames through the retina in {total_seconds:.2f}s "
+                          f"({total_frames / total_seconds if total_seconds else 0:.1f} frames/sec)")
+                    break
+                camera_data['vision'] = {device: preprocess(preprocessors, device, frame)
+                                         for device, frame in raw_frames.items()}
+            # Static scenes skip retina processing and the IPU send, apart from periodic keyframes
+            send_to_feagi = motion_gate.should_send(camera_data['vision'])
+            if send_to_feagi and len(camera_data['vision']) > 0:
+                retina_start = time()
                 previous_frame_data, rgb, default_capabilities = retina.process_visual_stimuli(
                     camera_data['vision'],
                     default_capabilities,
                     previous_frame_data,
                     rgb, capabilities)
+                retina_seconds += time() - retina_start
+                retina_frames += 1
+                total_seconds += time() - retina_start
+                total_frames += 1
+            if benchmark and time() - last_report >= 10:
+                print(f"Retina: {retina_frames / retina_seconds if retina_seconds else 0:.1f} frames/sec, "
+                      f"{retina_frames / (time() - last_report):.1f} bursts/sec with vision")
+                retina_frames = 0
+                retina_seconds = 0.0
+                last_report = time()
             for index in default_capabilities['input']['camera']:
                 default_capabilities['input']['camera'][index]['blink'].clear()
-            if rgb:
+            if send_to_feagi and rgb:
                 message_to_feagi = pns.generate_feagi_data(rgb, message_to_feagi)
-            sleep(feagi_settings['feagi_burst_speed'])  # bottleneck
-            pns.signals_to_feagi(message_to_feagi, feagi_ipu_channel, agent_settings, feagi_settings)
+            if not replayer:
+                sleep(feagi_settings['feagi_burst_speed'])  # bottleneck
+            if send_to_feagi:
+                pns.signals_to_feagi(message_to_feagi, feagi_ipu_channel, agent_settings, feagi_settings)
             message_to_feagi.clear()
             if 'camera' in rgb:
                 for i in rgb['camera']:
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright 2016-present Neuraville Inc. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================
+"""
+
+import cv2
+import numpy
+
+
+class MotionGate:
+    """
+    Decides per burst whether the camera frames changed enough to be worth sending to FEAGI.
+
+    Each frame is shrunk to a tiny grayscale copy and compared, by mean absolute difference, with the
+    copy that was last sent. Motion starts above `threshold` and only stops once the difference falls
+    below `threshold * hysteresis`, so noise around the threshold does not flicker. A keyframe is still
+    sent every `keyframe_interval` bursts. A threshold of 0 disables the gate.
+    """
+
+    def __init__(self, threshold=0, hysteresis=0.5, keyframe_interval=30, size=(32, 24)):
+        self.threshold = float(threshold)
+        self.release = self.threshold * float(hysteresis)
+        self.keyframe_interval = int(keyframe_interval)
+        self.size = tuple(size)
+        self.reference = {}
+        self.moving = False
+        self.bursts_since_send = 0
+        self.skipped = 0
+
+    def thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA).astype(numpy.float32)
+        if small.ndim == 3:
+            small = small[:, :, :3].mean(axis=2)
+        return small
+
+    def should_send(self, frames):
+        if self.threshold <= 0 or len(frames) == 0:
+            return True
+        if not isinstance(frames, dict):
+            frames = {0: frames}
+        thumbnails = {device: self.thumbnail(frames[device]) for device in frames
+                      if isinstance(frames[device], numpy.ndarray)}
+        difference = 0.0
+        for device in thumbnails:
+            if device not in self.reference:
+                difference = float("inf")
+                break
+            difference = max(difference,
+                             float(numpy.abs(thumbnails[device] - self.reference[device]).mean()))
+        self.moving = difference > (self.release if self.moving else self.threshold)
+        self.bursts_since_send += 1
+        if self.moving or self.bursts_since_send >= self.keyframe_interval:
+            self.reference = thumbnails
+            self.bursts_since_send = 0
+            return True
+        self.skipped += 1
+        return False
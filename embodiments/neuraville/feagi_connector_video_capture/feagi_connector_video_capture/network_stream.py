@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright 2016-present Neuraville Inc. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================
+"""
+
+import os
+import cv2
+import threading
+from time import time, sleep
+
+STREAM_PREFIXES = ("rtsp://", "rtsps://", "http://", "https://", "udp://", "tcp://")
+
+# Ask FFmpeg not to buffer ahead; the newest frame is all the connector wants
+os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay")
+
+
+def is_stream_url(device):
+    return isinstance(device, str) and device.lower().startswith(STREAM_PREFIXES)
+
+
+class NetworkStream:
+    """
+    Decodes an RTSP or HTTP (MJPEG) stream on its own thread and keeps only the latest frame, so a
+    slow consumer never works through a backlog. Reconnects with exponential backoff when the stream
+    drops. read() matches cv2.VideoCapture.read() and waits for a frame newer than the last one read.
+    """
+
+    def __init__(self, url, min_backoff=0.5, max_backoff=10.0, report_interval=10.0):
+        self.url = url
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.report_interval = report_interval
+        self.condition = threading.Condition()
+        self.frame = None
+        self.sequence = 0
+        self.read_sequence = 0
+        self.decoded_at = 0.0
+        self.decoded = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.fps = 0.0
+        self.latency = 0.0  # age of the frame when the consumer picked it up, in seconds
+        self.running = True
+        threading.Thread(target=self.decode, daemon=True).start()
+
+    def open(self):
+        cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def decode(self):
+        backoff = self.min_backoff
+        last_report = time()
+        while self.running:
+            cap = self.open()
+            if not cap.isOpened():
+                print(f"Stream {self.url} unavailable, retrying in {backoff:.1f}s")
+                cap.release()
+                sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                self.reconnects += 1
+                continue
+            backoff = self.min_backoff
+            last_frame = time()
+            while self.running:
+                check, frame = cap.read()
+                if not check:
+                    print(f"Stream {self.url} dropped, reconnecting")
+                    self.reconnects += 1
+                    break
+                now = time()
+                with self.condition:
+                    if self.sequence != self.read_sequence:
+                        self.dropped += 1  # the previous frame was never read
+                    self.frame = frame
+                    self.sequence += 1
+                    self.decoded_at = now
+                    self.decoded += 1
+                    self.condition.notify_all()
+                # Exponential moving average keeps the FPS readout steady
+                self.fps = 0.9 * self.fps + 0.1 * (1.0 / max(now - last_frame, 1e-6))
+                last_frame = now
+                if now - last_report >= self.report_interval:
+                    last_report = now
+                    print(self.url, self.metrics())
+            cap.release()
+
+    def read(self, timeout=1.0):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.sequence != self.read_sequence or not self.running,
+                                           timeout):
+                return False, self.frame  # stalled: keep showing the last frame while reconnecting
+            self.read_sequence = self.sequence
+            self.latency = time() - self.decoded_at
+            return self.frame is not None, self.frame
+
+    def metrics(self):
+        return {"fps": round(self.fps, 1), "latency_ms": round(self.latency * 1000, 1),
+                "decoded": self.decoded, "dropped": self.dropped, "reconnects": self.reconnects}
+
+    def isOpened(self):
+        return self.running
+
+    def release(self):
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
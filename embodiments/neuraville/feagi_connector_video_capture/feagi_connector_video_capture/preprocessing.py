@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright 2016-present Neuraville Inc. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================
+"""
+
+import cv2
+import numpy
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def gamma_table(gamma):
+    return ((numpy.arange(256) / 255.0) ** (1.0 / gamma) * 255).astype("uint8")
+
+
+class FramePreprocessor:
+    """
+    Per-camera crop, resize, mirror and gamma, built once from capabilities['input']['camera'][i]:
+    "crop": [x, y, width, height], "resize": [width, height], "mirror": bool, "gamma": float.
+
+    Crop is a view and resize runs first so the later steps touch as few pixels as possible.
+    Intermediate steps write into a scratch buffer allocated on the first frame. Each output is a new
+    array that belongs to the caller, because capture is not paced against the main loop or the
+    retina, and a reused output could be overwritten while one of them is still reading it.
+    """
+
+    def __init__(self, settings):
+        crop = settings.get("crop") or []
+        resize = settings.get("resize") or []
+        gamma = float(settings.get("gamma", 1.0) or 1.0)
+        self.crop = tuple(int(value) for value in crop) if len(crop) == 4 else None
+        self.size = (int(resize[0]), int(resize[1])) if len(resize) == 2 else None
+        self.mirror = bool(settings.get("mirror"))
+        self.table = gamma_table(gamma) if gamma != 1.0 else None
+        self.input_shape = None
+        self.output_shape = None
+        self.scratch = None
+
+        # Compiled once: each step reads the previous result and writes into a preallocated buffer
+        self.steps = []
+        if self.size:
+            self.steps.append(lambda src, dst: cv2.resize(src, self.size, dst=dst, interpolation=cv2.INTER_AREA))
+        if self.mirror:
+            self.steps.append(lambda src, dst: cv2.flip(src, 1, dst=dst))
+        if self.table is not None:
+            self.steps.append(self.apply_gamma)
+
+    def apply_gamma(self, src, dst):
+        if src.dtype == numpy.uint8:
+            cv2.LUT(src, self.table, dst=dst)
+        elif src is not dst:
+            numpy.copyto(dst, src)
+
+    def allocate(self, frame):
+        self.input_shape = frame.shape
+        if self.size:
+            shape = (self.size[1], self.size[0]) + frame.shape[2:]
+        else:
+            shape = frame.shape
+        self.output_shape = shape
+        self.scratch = numpy.empty(shape, dtype=frame.dtype)
+
+    def apply(self, frame):
+        if frame is None:
+            return frame
+        if self.crop:
+            x, y, width, height = self.crop
+            frame = frame[y:y + height, x:x + width]
+        if not self.steps:
+            return frame
+        if frame.shape != self.input_shape:
+            self.allocate(frame)
+        output = numpy.empty(self.output_shape, dtype=frame.dtype)
+        # The first step of two or more goes to scratch; everything after lands in output (LUT runs in place)
+        for number, step in enumerate(self.steps):
+            destination = self.scratch if number == 0 and len(self.steps) > 1 else output
+            step(frame, destination)
+            frame = destination
+        return output
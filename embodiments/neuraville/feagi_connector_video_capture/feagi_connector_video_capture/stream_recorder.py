@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright 2016-present Neuraville Inc. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================
+"""
+
+import pickle
+import struct
+import lz4.frame
+from time import time, sleep
+
+# File layout: repeated [8-byte little-endian length][lz4 frame of a pickled chunk]
+# The first chunk may be a header dict (FEAGI's cortical dimensions at recording time); every other
+# chunk is a list of (seconds since recording started, {device number: raw frame}) tuples.
+LENGTH = struct.Struct("<Q")
+
+
+class StreamRecorder:
+    def __init__(self, path, header=None, chunk_frames=30):
+        self.file = open(path, "wb")
+        self.chunk_frames = chunk_frames
+        self.chunk = []
+        self.start = None
+        self.frames = 0
+        if header:
+            self.write(header)
+
+    def add(self, frames):
+        now = time()
+        if self.start is None:
+            self.start = now
+        # Copy, since capture buffers may be reused before the chunk is written
+        self.chunk.append((now - self.start, {device: frame.copy() for device, frame in frames.items()
+                                              if frame is not None}))
+        self.frames += 1
+        if len(self.chunk) >= self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        if self.chunk:
+            self.write(self.chunk)
+            self.chunk = []
+
+    def write(self, item):
+        data = lz4.frame.compress(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL))
+        self.file.write(LENGTH.pack(len(data)))
+        self.file.write(data)
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_chunks(path):
+    with open(path, "rb") as recording:
+        while True:
+            header = recording.read(LENGTH.size)
+            if len(header) < LENGTH.size:
+                return
+            yield pickle.loads(lz4.frame.decompress(recording.read(LENGTH.unpack(header)[0])))
+
+
+class StreamReplayer:
+    """
+    Plays a recording back as {device number: frame} dicts, one chunk in memory at a time. With
+    realtime=True frames come out at their recorded timing, otherwise as fast as they can be read.
+    Loops by default so benchmarks can run for as long as needed.
+    """
+
+    def __init__(self, path, realtime=True, loop=True):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        first = next(read_chunks(path), None)
+        self.header = first if isinstance(first, dict) else {}
+        self.frames = self.iterate()
+        self.started = None
+
+    def iterate(self):
+        while True:
+            empty = True
+            for chunk in read_chunks(self.path):
+                if isinstance(chunk, dict):
+                    continue  # the header
+                for item in chunk:
+                    empty = False
+                    yield item
+            if empty or not self.loop:
+                return  # an empty recording would otherwise be re-read forever
+
+    def read(self):
+        item = next(self.frames, None)
+        if item is None:
+            return False, {}
+        offset, frames = item
+        now = time()
+        if self.started is None or offset == 0:
+            self.started = now - offset  # restart the clock at the beginning of each pass
+        if self.realtime:
+            delay = self.started + offset - now
+            if delay > 0:
+                sleep(delay)
+        return True, frames
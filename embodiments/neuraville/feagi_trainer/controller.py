@@ -19,6 +19,8 @@ limitations under the License.
 import json
 import copy
 import threading
+import telemetry
+import feagi_replay
 import flask_server
 from time import sleep
 from process_image import *
@@ -27,6 +29,7 @@ from feagi_connector import retina
 from feagi_connector import testing_mode
 from feagi_connector import pns_gateway as pns
 import dynamic_image_coordinates as img_coords
+from video_decoder import VideoDecoder, REALTIME
 from feagi_connector.version import __version__
 from feagi_connector import feagi_interface as feagi
 from feagi_connector import trainer as feagi_trainer
@@ -68,11 +71,19 @@ if __name__ == "__main__":
     message_to_feagi = config["message_to_feagi"].copy()
 
     # FEAGI registration - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-    feagi_settings, runtime_data, api_address, feagi_ipu_channel, feagi_opu_channel = (
-        feagi.connect_to_feagi(
-            feagi_settings, runtime_data, agent_settings, capabilities, __version__
+    benchmark = configuration.get("benchmark", {})
+    if benchmark.get("replay_path"):
+        # Offline benchmark: feed back recorded FEAGI responses instead of connecting
+        feagi_settings, runtime_data, api_address, feagi_ipu_channel, feagi_opu_channel = (
+            feagi_replay.start_replay(benchmark["replay_path"], feagi_settings, runtime_data,
+                                      benchmark.get("replay_mode", "burst"), benchmark.get("replay_speed", 1.0))
+        )
+    else:
+        feagi_settings, runtime_data, api_address, feagi_ipu_channel, feagi_opu_channel = (
+            feagi.connect_to_feagi(
+                feagi_settings, runtime_data, agent_settings, capabilities, __version__
+            )
         )
-    )
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     # Initialize a message counter from the FEAGI state
@@ -82,6 +93,9 @@ if __name__ == "__main__":
     if not pns.full_list_dimension:
         pns.full_list_dimension = pns.fetch_full_dimensions()
 
+    if benchmark.get("record_path") and not benchmark.get("replay_path"):
+        feagi_replay.start_recording(benchmark["record_path"], feagi_settings, runtime_data)
+
     # Initialize variables for vision processing
     rgb = dict()
     rgb["camera"] = dict()
@@ -163,16 +177,19 @@ if __name__ == "__main__":
             else:
                 if information_files[0][2] in feagi_trainer.video_extensions:
                     cap = information_files[0][0]
+                    decoder = VideoDecoder(cap, image_reader_config.get("video_policy", REALTIME),
+                                           image_reader_config.get("video_queue_size", 4),
+                                           max_cache_bytes=image_reader_config.get("video_cache_mb", 512) * 1024 * 1024).start()
                     while cap.isOpened():
                         if not latest_vals.feagi_controlled:
                             break
                         message_from_feagi = pns.message_from_feagi
-                        ret, raw_frame = cap.read()
-                        if ret:
-                            pass
-                        else:
-                            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        ret, raw_frame = decoder.read()
+                        if ret is None:
+                            print("Video decoder stalled: no frame for 1s")
                             continue
+                        if not ret:
+                            continue  # end of a pass; the decoder loops on its own
                         temporary_previous, rgb, default_capabilities, modified_data = retina.process_visual_stimuli_trainer(
                             raw_frame,
                             default_capabilities,
@@ -230,6 +247,7 @@ if __name__ == "__main__":
 
                         sleep(feagi_settings['burst_duration'])
                         previous_frame_data = temporary_previous.copy()
+                    decoder.stop()
                 else:
                     temporary_previous, rgb, default_capabilities, modified_data = retina.process_visual_stimuli_trainer(
                         raw_frame,
@@ -302,24 +320,26 @@ if __name__ == "__main__":
                 extension = image[2]
                 if extension in feagi_trainer.video_extensions:
                     cap = image[0]
-                    # check, raw_frame = new_cam.read() # webcam
-                    raw_frame = cap.read()[1]
+                    decoder = VideoDecoder(cap, image_reader_config.get("video_policy", REALTIME),
+                                           image_reader_config.get("video_queue_size", 4),
+                                           max_cache_bytes=image_reader_config.get("video_cache_mb", 512) * 1024 * 1024).start()
 
                     # Carry on with the image processing
                     if not image_reader_config["test_mode"]:
                         message_to_feagi = feagi_trainer.id_training_with_image(message_to_feagi, name_id)
                     if start_timer == 0.0:
                         start_timer = datetime.now()
+                        telemetry.start_presentation(image_id)
 
 
                     while cap.isOpened():
                         message_from_feagi = pns.message_from_feagi
-                        ret, raw_frame = cap.read()
-                        if ret:
-                            pass
-                        else:
+                        ret, raw_frame = decoder.read()
+                        if ret is None:
+                            print("Video decoder stalled: no frame for 1s")
+                        if not ret:
+                            # End of a pass or a stall: keep looping until the display duration runs out
                             if float(image_reader_config["image_display_duration"]) >= (datetime.now() - start_timer).total_seconds():
-                                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                                 continue
                             else:
                                 break
@@ -414,9 +434,12 @@ if __name__ == "__main__":
                         pns.signals_to_feagi(
                             message_to_feagi, feagi_ipu_channel, agent_settings, feagi_settings
                         )
+                        telemetry.record_burst(image_id)
 
                         # Sleep for the burst duration specified in the settings
                         sleep(feagi_settings["burst_duration"])
+                    decoder.stop()
+                    telemetry.end_presentation()
                     blank_image()  # reset the image or during gap
                     sleep(image_reader_config["image_gap_duration"])
                     previous_frame_data = temporary_previous.copy()
@@ -435,6 +458,7 @@ if __name__ == "__main__":
                         message_to_feagi = feagi_trainer.id_training_with_image(message_to_feagi, name_id)
                     if start_timer == 0.0:
                         start_timer = datetime.now()
+                        telemetry.start_presentation(image_id)
 
                     while (float(image_reader_config["image_display_duration"]) >= (
                             datetime.now() - start_timer).total_seconds()):
@@ -517,9 +541,11 @@ if __name__ == "__main__":
 
                         # Send signals to FEAGI
                         pns.signals_to_feagi(message_to_feagi, feagi_ipu_channel, agent_settings, feagi_settings)
+                        telemetry.record_burst(image_id)
 
                         # Sleep for the burst duration specified in the settings
                         sleep(feagi_settings["burst_duration"])
+                    telemetry.end_presentation()
                     blank_image()  # reset the image or during gap
                     sleep(image_reader_config["image_gap_duration"])
                     previous_frame_data = temporary_previous.copy()
@@ -0,0 +1,101 @@
+# Records FEAGI responses during a live session and replays them later, so the trainer can be benchmarked
+# without FEAGI. A recording is a pickle stream: one header dict, then (burst, seconds, message) tuples.
+import time
+import atexit
+import pickle
+import threading
+import telemetry
+from feagi_connector import pns_gateway as pns
+
+bursts_sent = 0  # signals_to_feagi calls since recording/replay started
+
+
+def count_bursts(signals_to_feagi):
+    def counted(*args, **kwargs):
+        global bursts_sent
+        bursts_sent += 1
+        if signals_to_feagi:
+            return signals_to_feagi(*args, **kwargs)
+    return counted
+
+
+def start_recording(path, feagi_settings, runtime_data, poll_interval=0.001):
+    # Capture every new pns.message_from_feagi snapshot, tagged with the burst it arrived in
+    recording = open(path, "wb")
+    pickle.dump({
+        "burst_duration": feagi_settings["burst_duration"],
+        "burst_counter": runtime_data["feagi_state"]["burst_counter"],
+        "full_list_dimension": pns.full_list_dimension,
+        "resize_list": pns.resize_list,
+    }, recording)
+    pns.signals_to_feagi = count_bursts(pns.signals_to_feagi)
+    start = time.time()
+
+    def record():
+        # pns stores every received message as a new object, so an identity check spots one without
+        # serializing anything; only new messages are pickled, keeping the live session's timing intact
+        last = None
+        while not recording.closed:
+            message_from_feagi = pns.message_from_feagi
+            if message_from_feagi is not last:
+                last = message_from_feagi
+                try:
+                    pickle.dump((bursts_sent, time.time() - start, message_from_feagi), recording)
+                except ValueError:
+                    break  # closed at exit
+            time.sleep(poll_interval)
+
+    atexit.register(recording.close)
+    threading.Thread(target=record, daemon=True).start()
+    print("Recording FEAGI responses to", path)
+
+
+def load_recording(path):
+    snapshots = []
+    with open(path, "rb") as recording:
+        header = pickle.load(recording)
+        while True:
+            try:
+                snapshots.append(pickle.load(recording))
+            except EOFError:
+                break
+    return header, snapshots
+
+
+def start_replay(path, feagi_settings, runtime_data, mode="burst", speed=1.0):
+    # Stand-in for feagi.connect_to_feagi. "burst" mode releases each snapshot on the same burst it was
+    # recorded in, so runs are identical on any machine; "time" mode follows the recorded timestamps.
+    header, snapshots = load_recording(path)
+    feagi_settings["burst_duration"] = header["burst_duration"]
+    runtime_data["feagi_state"] = {"burst_counter": header["burst_counter"]}
+    pns.full_list_dimension = header["full_list_dimension"]
+    pns.resize_list.update(header["resize_list"] or {})
+    pns.message_from_feagi = {}
+    pns.signals_to_feagi = count_bursts(None)  # null sink: nothing leaves the trainer
+    start = time.time()
+    cpu_start = time.process_time()
+
+    def report():
+        wall = time.time() - start
+        cpu = time.process_time() - cpu_start
+        images = telemetry.summary()["presentations"]
+        print(f"Replay: {bursts_sent} bursts in {wall:.2f}s ({bursts_sent / wall if wall else 0:.1f}/s), "
+              f"CPU {cpu:.2f}s" + (f", {cpu / images:.4f}s CPU per image" if images else ""))
+
+    def replay():
+        for burst, seconds, message in snapshots:
+            if mode == "time":
+                delay = seconds / speed - (time.time() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                while bursts_sent < burst:
+                    time.sleep(0.0005)
+            pns.message_from_feagi = message
+        print("Replay finished")
+        report()
+
+    atexit.register(report)
+    threading.Thread(target=replay, daemon=True).start()
+    print(f"Replaying {len(snapshots)} FEAGI responses from {path} ({mode} mode)")
+    return feagi_settings, runtime_data, None, None, None
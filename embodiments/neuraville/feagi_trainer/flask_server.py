@@ -3,8 +3,9 @@ import cv2
 import time
 import logging
 import numpy as np
+import telemetry
 from flask import Flask, request, Response, render_template_string, jsonify
-from models import empty_latest_static
+from models import LatestStatic
 
 # logging.basicConfig(level=logging.DEBUG)
 log = logging.getLogger("werkzeug")
@@ -15,7 +16,7 @@ app = Flask(__name__)
 start_time = time.time()
 latest_image = []
 latest_raw_image = []
-latest_static = empty_latest_static
+latest_static = LatestStatic()
 
 
 @app.route("/")
@@ -329,36 +330,42 @@ def index():
         </body>
         </html>
     """
+    static = latest_static.snapshot()
     return render_template_string(
         html,
         runtime=f"{runtime:.2f}",
-        image_id=latest_static.image_id,
-        feagi_image_id=latest_static.feagi_image_id,
-        correct_count=latest_static.correct_count,
-        incorrect_count=latest_static.incorrect_count,
-        no_reply_count=latest_static.no_reply_count,
-        image_dimensions=latest_static.image_dimensions,
-        raw_image_dimensions=latest_static.raw_image_dimensions,
-        feagi_controlled="checked" if latest_static.feagi_controlled else "",
-        image_display_duration=latest_static.image_display_duration,
-        image_gap_duration=latest_static.image_gap_duration,
-        image_path=latest_static.image_path or "",
-        loop="checked" if latest_static.loop else "",
-        test_mode="checked" if latest_static.test_mode else "",
+        image_id=static["image_id"],
+        feagi_image_id=static["feagi_image_id"],
+        correct_count=static["correct_count"],
+        incorrect_count=static["incorrect_count"],
+        no_reply_count=static["no_reply_count"],
+        image_dimensions=static["image_dimensions"],
+        raw_image_dimensions=static["raw_image_dimensions"],
+        feagi_controlled="checked" if static["feagi_controlled"] else "",
+        image_display_duration=static["image_display_duration"],
+        image_gap_duration=static["image_gap_duration"],
+        image_path=static["image_path"] or "",
+        loop="checked" if static["loop"] else "",
+        test_mode="checked" if static["test_mode"] else "",
     )
 
 
 # Process latest image for HTML display
 def gen(use_raw=True):
+    last_data = None
+    frame = None
     while True:
         if use_raw:
             data = latest_raw_image
         else:
             data = latest_image
         if isinstance(data, np.ndarray):
-            ret, buffer = cv2.imencode(".jpg", data)
-            if ret:
-                frame = buffer.tobytes()
+            # process_image hands back the same array while nothing changed, so only encode new ones
+            if data is not last_data:
+                ret, buffer = cv2.imencode(".jpg", data)
+                last_data = data
+                frame = buffer.tobytes() if ret else None
+            if frame:
                 yield (
                     b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + frame + b"\r\n"
                 )
@@ -366,9 +373,7 @@ def gen(use_raw=True):
 
 # Update static config data
 def update_latest_static(data):
-    for key, value in data.items():
-        if hasattr(latest_static, key):
-            setattr(latest_static, key, value)
+    latest_static.update(data)
 
 
 # Apply initial config settings from controller
@@ -385,7 +390,7 @@ def apply_settings():
     try:
         data = request.get_json()
         update_latest_static(data)
-        return jsonify({"status": "success", "settings": latest_static.dict()})
+        return jsonify({"status": "success", "settings": latest_static.snapshot()})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 400
 
@@ -405,19 +410,33 @@ def raw_frame_feed():
 # Fetch latest image ID and any FEAGI recognition ID
 @app.route("/latest_ids")
 def latest_ids():
-    return jsonify(latest_static.dict())
+    return jsonify(latest_static.snapshot())
+
+
+# Fetch recognition latency percentiles, histogram and confusion matrix
+@app.route("/telemetry")
+def telemetry_summary():
+    return jsonify(telemetry.summary())
+
+
+# Download every finished image presentation as CSV
+@app.route("/telemetry.csv")
+def telemetry_csv():
+    return Response(telemetry.to_csv(), mimetype="text/csv",
+                    headers={"Content-Disposition": "attachment; filename=trainer_telemetry.csv"})
 
 
 # Reset timer and data
 @app.route("/reset_timer_and_data")
 def reset_timer_and_data():
-    latest_static = empty_latest_static
+    latest_static.reset_counters()
+    telemetry.reset()
     start_time = time.time()
     return jsonify(
         {
             "status": "success",
             "start_time": start_time,
-            "reset_data": latest_static.dict(),
+            "reset_data": latest_static.snapshot(),
         }
     )
 
@@ -1,39 +1,65 @@
-from pydantic import BaseModel
-from typing import Optional
+import threading
 
 
-class LatestStatic(BaseModel):
-    image_id: str = ""
-    feagi_image_id: str = ""
-    correct_count: int = 0
-    incorrect_count: int = 0
-    no_reply_count: int = 0
-    image_dimensions: str = ""
-    raw_image_dimensions: str = ""
-    last_image_time: Optional[float] = None
-    last_feagi_time: Optional[float] = None
-    feagi_controlled: Optional[bool] = None
-    loop: Optional[bool] = None
-    image_display_duration: Optional[float] = None
-    image_path: Optional[str] = None
-    test_mode: Optional[bool] = None
-    image_gap_duration: Optional[float] = None
+class LatestStatic:
+    # Shared between the trainer loop and Flask threads. Counters change under the lock and the
+    # HTTP layer reads a consistent copy with snapshot() instead of rebuilding a model per update.
+    __slots__ = (
+        "lock",
+        "image_id",
+        "feagi_image_id",
+        "correct_count",
+        "incorrect_count",
+        "no_reply_count",
+        "image_dimensions",
+        "raw_image_dimensions",
+        "last_image_time",
+        "last_feagi_time",
+        "feagi_controlled",
+        "loop",
+        "image_display_duration",
+        "image_path",
+        "test_mode",
+        "image_gap_duration",
+    )
+    fields = __slots__[1:]
 
+    def __init__(self, **values):
+        self.lock = threading.Lock()
+        self.image_id = ""
+        self.feagi_image_id = ""
+        self.correct_count = 0
+        self.incorrect_count = 0
+        self.no_reply_count = 0
+        self.image_dimensions = ""
+        self.raw_image_dimensions = ""
+        self.last_image_time = None
+        self.last_feagi_time = None
+        self.feagi_controlled = None
+        self.loop = None
+        self.image_display_duration = None
+        self.image_path = None
+        self.test_mode = None
+        self.image_gap_duration = None
+        self.update(values)
 
-empty_latest_static = LatestStatic(
-    image_id="",
-    feagi_image_id="",
-    correct_count=0,
-    incorrect_count=0,
-    no_reply_count=0,
-    image_dimensions="",
-    raw_image_dimensions="",
-    last_image_time=None,
-    last_feagi_time=None,
-    feagi_controlled=None,
-    image_display_duration=None,
-    image_gap_duration=None,
-    loop=None,
-    image_path=None,
-    test_mode=None,
-)
+    def update(self, values):
+        # Apply any known fields from a dict (configuration or browser settings); unknown keys are ignored
+        with self.lock:
+            for key, value in values.items():
+                if key in self.fields:
+                    setattr(self, key, value)
+
+    def reset_counters(self):
+        with self.lock:
+            self.image_id = ""
+            self.feagi_image_id = ""
+            self.correct_count = 0
+            self.incorrect_count = 0
+            self.no_reply_count = 0
+            self.last_image_time = None
+            self.last_feagi_time = None
+
+    def snapshot(self):
+        with self.lock:
+            return {key: getattr(self, key) for key in self.fields}
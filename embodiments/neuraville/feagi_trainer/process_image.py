@@ -1,23 +1,23 @@
 import cv2
+import zlib
 import numpy as np
 
 default_blank = np.zeros((500, 500, 3), dtype=np.uint8)
 
+# Last resized frame and the overlay drawn on it, so unchanged frames cost no resize or redraw
+display_cache = {"version": None, "base": None, "corners": None, "frame": None}
+
+
+def frame_version(image):
+    # Cheap content key for the small retina output when the caller does not pass its own version
+    return image.shape, zlib.crc32(np.ascontiguousarray(image).data)
+
+
 def get_corners(location_data, size_of_cortical, target_size):
-    min_x = min_y = float('inf')
-    max_x = max_y = float('-inf')
-
-    # Calculate min and max coordinates
-    for key in location_data.keys():
-        x, y = key[0], key[1]
-        if x < min_x:
-            min_x = x
-        if x > max_x:
-            max_x = x
-        if y < min_y:
-            min_y = y
-        if y > max_y:
-            max_y = y
+    # Keys are voxel coordinates like (x, y, z); take the min/max of x and y in one pass
+    coordinates = np.array(list(location_data.keys()))[:, :2].astype(float)
+    min_x, min_y = coordinates.min(axis=0)
+    max_x, max_y = coordinates.max(axis=0)
 
     # Normalize coordinates based on size_of_cortical
     normalized_min_x = min_x / (size_of_cortical[0] - 1)
@@ -36,33 +36,51 @@ def get_corners(location_data, size_of_cortical, target_size):
     return top_left, bottom_right
 
 
-# example location_data: {'0-0-0': 100, '0-1-0': 100 . . .}, example size_of_cortical: [32, 16, 1]
-def process_image(image, location_data=None, size_of_cortical=None):
-    copied_image = image.copy()
+def draw_box(frame, top_left, bottom_right):
+    # Define the border thickness
+    border_thickness = 3
 
-    # Resize the image while maintaining aspect ratio
-    target_width = 400
-    original_height, original_width = copied_image.shape[:2]
-    aspect_ratio = original_width / original_height
-    target_height = int(target_width / aspect_ratio)
-    resized_frame = cv2.resize(copied_image, (target_width, target_height))
+    # Draw the outer black rectangle (border)
+    cv2.rectangle(frame,
+                  (top_left[0] - border_thickness, top_left[1] - border_thickness),
+                  (bottom_right[0] + border_thickness, bottom_right[1] + border_thickness),
+                  (0, 0, 0), border_thickness)
 
-    if location_data and size_of_cortical:
-        top_left, bottom_right = get_corners(location_data, size_of_cortical, (target_width, target_height))
+    # Draw the inner green rectangle
+    cv2.rectangle(frame, top_left, bottom_right, (0, 255, 0), 2)
 
-        # Define the border thickness
-        border_thickness = 3
 
-        # Draw the outer black rectangle (border)
-        cv2.rectangle(resized_frame,
-                      (top_left[0] - border_thickness, top_left[1] - border_thickness),
-                      (bottom_right[0] + border_thickness, bottom_right[1] + border_thickness),
-                      (0, 0, 0), border_thickness)
+# example location_data: {(0, 0, 0): 100, (0, 1, 0): 100 . . .}, example size_of_cortical: [32, 16, 1]
+def process_image(image, location_data=None, size_of_cortical=None, version=None):
+    # The returned frame is shared with the Flask stream, so it is never modified after it is returned
+    if version is None:
+        version = frame_version(image)
 
-        # Draw the inner green rectangle
-        cv2.rectangle(resized_frame, top_left, bottom_right, (0, 255, 0), 2)
-        return resized_frame
-    return resized_frame
+    if display_cache["version"] != version:
+        # Resize the image while maintaining aspect ratio
+        target_width = 400
+        original_height, original_width = image.shape[:2]
+        aspect_ratio = original_width / original_height
+        target_height = int(target_width / aspect_ratio)
+        display_cache["version"] = version
+        display_cache["base"] = cv2.resize(image, (target_width, target_height))
+        display_cache["corners"] = None
+        display_cache["frame"] = display_cache["base"]
+    base = display_cache["base"]
+
+    corners = None
+    if location_data and size_of_cortical:
+        corners = get_corners(location_data, size_of_cortical, (base.shape[1], base.shape[0]))
+
+    if corners != display_cache["corners"]:
+        display_cache["corners"] = corners
+        if corners:
+            frame = base.copy()
+            draw_box(frame, *corners)
+            display_cache["frame"] = frame
+        else:
+            display_cache["frame"] = base
+    return display_cache["frame"]
 
 def blank_image(location_data=None):
     global default_blank
@@ -70,18 +88,6 @@ def blank_image(location_data=None):
 
     if location_data:
         top_left, bottom_right = get_corners(location_data, size_of_cortical=default_blank.shape[1::-1], target_size=resized_frame.shape[1::-1])
-
-        # Define the border thickness
-        border_thickness = 3
-
-        # Draw the outer black rectangle (border)
-        cv2.rectangle(resized_frame,
-                      (top_left[0] - border_thickness, top_left[1] - border_thickness),
-                      (bottom_right[0] + border_thickness, bottom_right[1] + border_thickness),
-                      (0, 0, 0), border_thickness)
-
-        # Draw the inner green rectangle
-        cv2.rectangle(resized_frame, top_left, bottom_right, (0, 255, 0), 2)
-
+        draw_box(resized_frame, top_left, bottom_right)
         return resized_frame
     return default_blank
@@ -0,0 +1,122 @@
+# Tracks how long FEAGI takes to recognize each presented image, for tuning display and gap durations.
+import io
+import csv
+import time
+import threading
+import numpy as np
+from collections import deque
+
+NO_REPLY = "none"
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10]  # seconds; the last bucket is open-ended
+MAX_PRESENTATIONS = 10000  # finished presentations kept for the summary and CSV; older ones are dropped
+
+lock = threading.Lock()
+presentations = deque(maxlen=MAX_PRESENTATIONS)  # finished presentations, oldest first
+current = None  # presentation still on screen
+confusion = {}  # {correct image id: {FEAGI guess: count}}
+
+
+def new_presentation(image_id):
+    return {
+        "image_id": image_id,
+        "started_at": time.time(),
+        "bursts": 0,
+        "first_guess": None,
+        "latency_seconds": None,
+        "latency_bursts": None,
+    }
+
+
+def start_presentation(image_id):
+    global current
+    with lock:
+        if current is not None:
+            finish_locked()
+        current = new_presentation(image_id)
+
+
+def end_presentation():
+    with lock:
+        if current is not None:
+            finish_locked()
+
+
+def finish_locked():
+    global current
+    if current["first_guess"] is None:
+        row = confusion.setdefault(current["image_id"], {})
+        row[NO_REPLY] = row.get(NO_REPLY, 0) + 1
+    presentations.append(current)
+    current = None
+
+
+def record_burst(image_id):
+    # Called once per burst the image is sent to FEAGI, after start_presentation()
+    with lock:
+        if current is not None and current["image_id"] == image_id:
+            current["bursts"] += 1
+
+
+def record_reply(feagi_image_id):
+    with lock:
+        if current is None:
+            return
+        row = confusion.setdefault(current["image_id"], {})
+        row[feagi_image_id] = row.get(feagi_image_id, 0) + 1
+        if current["first_guess"] is None:
+            current["first_guess"] = feagi_image_id
+        if feagi_image_id == current["image_id"] and current["latency_seconds"] is None:
+            current["latency_seconds"] = time.time() - current["started_at"]
+            current["latency_bursts"] = current["bursts"]
+
+
+def reset():
+    global current
+    with lock:
+        presentations.clear()
+        confusion.clear()
+        current = None
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"p50": float(p50), "p95": float(p95)}
+
+
+def histogram(values):
+    counts = [0] * (len(LATENCY_BUCKETS) + 1)
+    for value in values:
+        counts[int(np.searchsorted(LATENCY_BUCKETS, value))] += 1
+    labels = [f"<={edge}" for edge in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}"]
+    return dict(zip(labels, counts))
+
+
+def summary():
+    with lock:
+        finished = list(presentations)
+        matrix = {image_id: dict(row) for image_id, row in confusion.items()}
+    recognized = [p for p in finished if p["latency_seconds"] is not None]
+    seconds = [p["latency_seconds"] for p in recognized]
+    bursts = [p["latency_bursts"] for p in recognized]
+    return {
+        "presentations": len(finished),
+        "recognized": len(recognized),
+        "latency_seconds": percentiles(seconds),
+        "latency_bursts": percentiles(bursts),
+        "latency_histogram": histogram(seconds),
+        "confusion_matrix": matrix,
+    }
+
+
+def to_csv():
+    with lock:
+        finished = list(presentations)
+    fields = ["image_id", "started_at", "bursts", "first_guess", "latency_seconds", "latency_bursts"]
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=fields)
+    writer.writeheader()
+    for presentation in finished:
+        writer.writerow(presentation)
+    return output.getvalue()
@@ -0,0 +1,135 @@
+# Decodes trainer videos on a background thread so cap.read() stays off the FEAGI loop.
+import cv2
+import time
+import queue
+import threading
+
+REALTIME = "realtime"  # drop stale frames when the trainer falls behind
+EVERY_FRAME = "every_frame"  # block the decoder until the trainer consumes each frame
+END_OF_PASS = None  # queued after the last frame of every pass through the video
+TIMED_OUT = (None, None)  # read() result when no frame arrived in time, unlike (False, None) at a pass end
+
+
+class VideoDecoder:
+    def __init__(self, cap, policy=REALTIME, queue_size=4, loop=True, max_cache_bytes=512 * 1024 * 1024):
+        self.cap = cap
+        self.policy = policy if policy in (REALTIME, EVERY_FRAME) else REALTIME
+        self.loop = loop
+        self.max_cache_bytes = max_cache_bytes
+        self.frames = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.dropped = 0  # updated by both the reader and the decoder thread, under drop_lock
+        self.drop_lock = threading.Lock()
+        self.decoded = 0
+        fps = cap.get(cv2.CAP_PROP_FPS) if cap is not None else 0
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        # Unblock a decoder waiting on a full queue in EVERY_FRAME mode
+        try:
+            while True:
+                self.frames.get_nowait()
+        except queue.Empty:
+            pass
+        self._thread.join(timeout=1)
+
+    def read(self, timeout=1.0):
+        # Same contract as cap.read(): (False, None) marks the end of one pass through the video.
+        # A stalled decoder returns TIMED_OUT instead, so callers can tell the two apart.
+        try:
+            frame = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return TIMED_OUT
+        if self.policy == REALTIME:
+            while frame is not END_OF_PASS:
+                try:
+                    newer = self.frames.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is END_OF_PASS:
+                    # Keep the marker for the next read so the caller still sees the pass end
+                    self._put(END_OF_PASS)
+                    break
+                self.count_drop()
+                frame = newer
+        if frame is END_OF_PASS:
+            return False, None
+        return True, frame
+
+    def count_drop(self):
+        with self.drop_lock:
+            self.dropped += 1
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            if self.policy == EVERY_FRAME or item is END_OF_PASS:
+                try:
+                    self.frames.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            try:
+                self.frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    if self.frames.get_nowait() is not END_OF_PASS:
+                        self.count_drop()
+                except queue.Empty:
+                    pass
+
+    def _pace(self, last_time):
+        # Only pace in REALTIME mode; EVERY_FRAME is paced by the consumer through the queue
+        if self.policy == REALTIME and self.frame_interval:
+            remaining = self.frame_interval - (time.time() - last_time)
+            if remaining > 0:
+                self._stop.wait(remaining)
+        return time.time()
+
+    def _run(self):
+        # First pass decodes from the file and caches the frames so later passes need no seek. Frames
+        # stay at source resolution, since the raw view and the central vision crop need every pixel.
+        cached = []
+        cached_bytes = 0
+        cache_complete = True
+        last_time = time.time()
+        while not self._stop.is_set() and self.cap.isOpened():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            self.decoded += 1
+            if cache_complete:
+                cached_bytes += frame.nbytes
+                if cached_bytes <= self.max_cache_bytes:
+                    cached.append(frame)
+                else:
+                    cached = []
+                    cache_complete = False
+            last_time = self._pace(last_time)
+            self._put(frame)
+        self._put(END_OF_PASS)
+
+        while self.loop and not self._stop.is_set():
+            if cache_complete and cached:
+                for frame in cached:
+                    if self._stop.is_set():
+                        return
+                    last_time = self._pace(last_time)
+                    self._put(frame)
+            else:
+                # Too long to keep in memory, so rewind the file instead
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.cap.read()
+                if not ret:
+                    return
+                while ret and not self._stop.is_set():
+                    last_time = self._pace(last_time)
+                    self._put(frame)
+                    ret, frame = self.cap.read()
+            self._put(END_OF_PASS)
@@ -0,0 +1,127 @@
+import time
+import threading
+
+
+def clamp(value, limit):
+    return max(-limit, min(limit, int(value)))
+
+
+class CommandScheduler:
+    """
+    Coalesces flight commands so at most one goes out per interval. Motion submitted within one
+    interval is added up into a single pending move (x forward, y left, z up in cm, yaw clockwise in
+    degrees). Moves below rc_threshold on every axis are flown with `rc` stick commands, held just long
+    enough to cover the requested distance at the requested speed; larger ones become `go`/`cw`/`ccw`
+    and wait for the drone's reply on this thread. While a move is in flight, a submission that repeats
+    it is dropped as stale instead of being flown a second time.
+
+    rc_full_speed and rc_full_yaw are how far the drone travels per second at full stick, in cm and
+    degrees; they are approximate and worth calibrating on a real drone.
+    """
+
+    def __init__(self, tello, interval=0.1, rc_threshold=50, rc_full_speed=100.0, rc_full_yaw=100.0,
+                 report_interval=10.0):
+        self.tello = tello
+        self.interval = interval
+        self.rc_threshold = rc_threshold  # cm (or degrees for yaw); below this, rc is used
+        self.rc_full_speed = rc_full_speed
+        self.rc_full_yaw = rc_full_yaw
+        self.report_interval = report_interval
+        self.lock = threading.Lock()
+        self.pending = None  # [x, y, z, yaw, speed] summed over the current interval
+        self.in_flight = None  # (x, y, z, yaw) being flown, by rc until rc_until or by a go/cw/ccw
+        self.rc_until = 0.0
+        self.sent_rc = 0
+        self.sent_moves = 0
+        self.dropped = 0
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, x=0, y=0, z=0, yaw=0, speed=50):
+        with self.lock:
+            if self.in_flight == (x, y, z, yaw):
+                self.dropped += 1  # the drone is already flying this move
+                return
+            if self.pending is None:
+                self.pending = [x, y, z, yaw, speed]
+            else:
+                self.pending[0] += x
+                self.pending[1] += y
+                self.pending[2] += z
+                self.pending[3] += yaw
+                self.pending[4] = speed
+
+    def clear(self):
+        # Forget pending motion, e.g. before takeoff, land or an emergency stop
+        with self.lock:
+            self.pending = None
+
+    def run(self):
+        next_tick = time.time()
+        last_report = next_tick
+        while self.running:
+            next_tick += self.interval
+            delay = next_tick - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.time()  # a move took longer than the interval; don't burst afterwards
+            with self.lock:
+                motion, self.pending = self.pending, None
+            try:
+                if motion is None:
+                    if self.rc_until and time.time() >= self.rc_until:
+                        self.stop_rc()  # distance covered; stop drifting
+                elif max(abs(value) for value in motion[:4]) < self.rc_threshold:
+                    self.send_rc(*motion)
+                else:
+                    self.send_move(*motion)
+            except Exception as e:
+                print("Command failed:", e)
+            if time.time() - last_report >= self.report_interval:
+                last_report = time.time()
+                print(f"Commands: {self.sent_rc} rc, {self.sent_moves} moves, {self.dropped} stale dropped")
+
+    def send_rc(self, x, y, z, yaw, speed):
+        # Fly the move at speed cm/s (yaw at the matching stick), taking at least one interval
+        speed = max(10, min(100, int(speed)))
+        duration = max(max(abs(x), abs(y), abs(z)) / speed,
+                       abs(yaw) / (self.rc_full_yaw * speed / self.rc_full_speed), self.interval)
+        linear = 100 / (duration * self.rc_full_speed)  # stick percent per cm of the move
+        turn = 100 / (duration * self.rc_full_yaw)  # stick percent per degree
+        # rc takes -100..100 per stick: left/right (right positive), forward/back, up/down, yaw
+        self.tello.send_command_without_return("rc {} {} {} {}".format(
+            clamp(-y * linear, 100), clamp(x * linear, 100), clamp(z * linear, 100), clamp(yaw * turn, 100)))
+        with self.lock:
+            self.in_flight = (x, y, z, yaw)
+        self.rc_until = time.time() + duration
+        self.sent_rc += 1
+
+    def stop_rc(self):
+        self.tello.send_command_without_return("rc 0 0 0 0")
+        self.rc_until = 0.0
+        with self.lock:
+            self.in_flight = None
+
+    def send_move(self, x, y, z, yaw, speed):
+        if self.rc_until:
+            self.stop_rc()
+        with self.lock:
+            self.in_flight = (x, y, z, yaw)
+        # The drone replies once the move is done; until then this thread holds the next command
+        try:
+            if int(yaw):
+                self.tello.send_command_with_return(
+                    "{} {}".format("cw" if yaw > 0 else "ccw", min(abs(int(yaw)), 360)))
+                self.sent_moves += 1
+            # go rejects moves where every axis is below 20 cm, so those are skipped
+            if max(abs(x), abs(y), abs(z)) >= 20:
+                self.tello.send_command_with_return("go {} {} {} {}".format(
+                    clamp(x, 500), clamp(y, 500), clamp(z, 500), max(10, min(100, int(speed)))))
+                self.sent_moves += 1
+        finally:
+            with self.lock:
+                self.in_flight = None
+
+    def stop(self):
+        self.running = False
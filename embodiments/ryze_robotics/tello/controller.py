@@ -1,14 +1,16 @@
+import os
 import time
 import threading
 from djitellopy import Tello
 from version import __version__
+from video_stage import VideoStage, DeltaSlot
+from command_scheduler import CommandScheduler
 from feagi_connector import retina
 from feagi_connector import sensors
 from feagi_connector import actuators
 from feagi_connector import pns_gateway as pns
 from feagi_connector import feagi_interface as FEAGI
 
-previous_frame_data = dict()
 flag = False
 camera_data = {"vision": []}
 speed = {'0': 50}
@@ -126,9 +128,26 @@ def misc_control(self, data, battery_level):
             print("Error at: ", e)
 
 
-def full_frame(self):
-    frame_read = self.get_frame_read()
-    return frame_read.frame
+def process_vision(video, default_capabilities, capabilities, vision):
+    # Runs the retina on each new decoded frame, away from the flight loop
+    previous_frame_data = dict()
+    rgb = dict()
+    rgb['camera'] = dict()
+    while True:
+        sequence, raw_frame = video.read_newer()
+        if raw_frame is None:
+            continue
+        camera_data['vision'] = raw_frame
+        # Post image into vision
+        previous_frame_data, rgb, default_capabilities = retina.process_visual_stimuli(
+            raw_frame,
+            default_capabilities,
+            previous_frame_data,
+            rgb, capabilities)
+        # Merged by copy, since the retina fills the same dicts again on the next frame
+        vision.merge(rgb['camera'])
+        for name in rgb['camera']:
+            rgb['camera'][name].clear()
 
 
 def start_camera(self):
@@ -138,11 +157,6 @@ def start_camera(self):
     self.streamon()
 
 
-def navigate_to_xyz(self, x=0, y=0, z=0, s=0):
-    cmd = 'go {} {} {} {}'.format(x, y, z, s)
-    self.send_command_without_return(cmd)
-
-
 def get_motion_vector(direction, magnitude):
     if direction == "move_left":
         return (0, 100 * magnitude, 0)
@@ -159,17 +173,17 @@ def get_motion_vector(direction, magnitude):
     return (0, 0, 0)
 
 
-def process_motion_control(data, index, tello, speed):
+def process_motion_control(data, index, scheduler, speed):
     if not data.get('motion_control', {}).get(int(index)):
         return
 
-    total_x = total_y = total_z = 0
+    total_x = total_y = total_z = total_yaw = 0
     motions = data['motion_control'][int(index)]
 
     for direction, value in motions.items():
         if 'yaw' in direction:
-            cmd = "cw" if direction == "yaw_left" else "ccw"
-            tello.send_command_without_return(f"{cmd} {int(value) * 100}")
+            # yaw_left has always been sent as cw; the scheduler takes clockwise as positive
+            total_yaw += value * 100 if direction == "yaw_left" else -value * 100
             continue
 
         x, y, z = get_motion_vector(direction, value)
@@ -177,14 +191,15 @@ def process_motion_control(data, index, tello, speed):
         total_y += y
         total_z += z
 
-    if any((total_x, total_y, total_z)):
-        navigate_to_xyz(tello, total_x, total_y, total_z, speed['0'])
+    if any((total_x, total_y, total_z, total_yaw)):
+        scheduler.submit(total_x, total_y, total_z, total_yaw, speed['0'])
 
 
 def action(obtained_signals):
     global speed
     recieve_emergency_stop = actuators.check_emergency_stop(obtained_signals)
     if recieve_emergency_stop:
+        scheduler.clear()
         tello.send_command_without_return("emergency")  # STOP EVERYTHING IMMEDIATELY
     recieve_motion_control_data = actuators.get_motion_control_data(obtained_signals)
     recieve_speed_data = actuators.check_new_speed(obtained_signals)
@@ -194,7 +209,7 @@ def action(obtained_signals):
 
     if recieve_motion_control_data:
         for index in capabilities['output']['motion_control']:
-            process_motion_control(recieve_motion_control_data, index, tello, speed)
+            process_motion_control(recieve_motion_control_data, index, scheduler, speed)
 
     if 'misc' in obtained_signals:
         for i in obtained_signals['misc']:
@@ -214,10 +229,10 @@ def action(obtained_signals):
             except Exception as e:
                 data2 = 0
             try:
-                speed = obtained_signals['speed'][0] * 10
+                navigation_speed = obtained_signals['speed'][0] * 10
             except Exception as e:
-                speed = 0
-            navigate_to_xyz(tello, data0, data1, data2, speed)
+                navigation_speed = 0
+            scheduler.submit(data0, data1, data2, 0, navigation_speed)
 
 
 if __name__ == '__main__':
@@ -244,17 +259,27 @@ if __name__ == '__main__':
     flag_counter = 0
     checkpoint_total = 5
     flying_flag = False
-    rgb = dict()
-    rgb['camera'] = dict()
+    vision = DeltaSlot()
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # - - - # Initializer section
-    tello = Tello()
+    # TELLO_HOST/TELLO_COMMAND_PORT point the controller at tello_simulator.py instead of a drone
+    tello = Tello(os.environ.get('TELLO_HOST', Tello.TELLO_IP))
+    if os.environ.get('TELLO_COMMAND_PORT'):
+        tello.address = (tello.address[0], int(os.environ['TELLO_COMMAND_PORT']))
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # - - - #
     print("Connecting with Tello drone...")
     tello.connect()
     print("Connected with Tello drone.")
+    # Flight commands go through the scheduler so the drone's command queue never backs up
+    motion_settings = capabilities['output']['motion_control']['0']
+    scheduler = CommandScheduler(tello, motion_settings.get('command_interval', 0.1),
+                                 motion_settings.get('rc_threshold', 50))
     start_camera(tello)
+    video = VideoStage(tello.get_udp_video_address(),
+                       capabilities['input']['camera']['0'].get('decode_resolution'))
+    threading.Thread(target=process_vision, args=(video, default_capabilities, capabilities, vision),
+                     daemon=True).start()
 
     # overwrite manual
     threading.Thread(target=retina.vision_progress, args=(default_capabilities, feagi_settings, camera_data,), daemon=True).start()
@@ -272,17 +297,12 @@ if __name__ == '__main__':
             acc = get_accelerator(data)
             sonar = get_ultrasonic(data)
             battery = get_battery(data)
-            raw_frame = full_frame(tello)
-            camera_data['vision'] = raw_frame
-            # Post image into vision
-            previous_frame_data, rgb, default_capabilities = retina.process_visual_stimuli(
-                raw_frame,
-                default_capabilities,
-                previous_frame_data,
-                rgb, capabilities)
 
             # INSERT SENSORS INTO the FEAGI DATA SECTION BEGIN
-            message_to_feagi = pns.generate_feagi_data(rgb,message_to_feagi)
+            # Vision arrives from its own thread; every change since the last burst is sent once
+            vision_camera = vision.take()
+            if vision_camera:
+                message_to_feagi = pns.generate_feagi_data({'camera': vision_camera}, message_to_feagi)
             # Add gyro data into feagi data
             if gyro:
                 message_to_feagi = sensors.create_data_for_feagi('gyro', capabilities, message_to_feagi, gyro,
@@ -310,5 +330,7 @@ if __name__ == '__main__':
             time.sleep(feagi_settings['feagi_burst_speed'])
         except KeyboardInterrupt as ke:
             print("ERROR: ", ke)
+            video.stop()
+            scheduler.stop()
             tello.end()
             break
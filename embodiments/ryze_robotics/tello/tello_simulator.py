@@ -0,0 +1,187 @@
+"""
+Stand-in for a Tello drone so controller.py can be load- and latency-tested without hardware.
+
+It answers SDK commands the way the drone does: one at a time, replying "ok" once a move would have
+finished, and never replying to rc. It streams a synthetic state string at 10 Hz to port 8890 and,
+given an H.264 file, loops it to port 11111. Every few seconds it prints the command rate the
+controller generates and the command-to-ack latency, which includes any time spent queued.
+
+The controller binds UDP 8889 itself, so run the simulator on another port and point the controller
+at it:
+    python3 tello_simulator.py --port 9889 --video test.h264
+    TELLO_HOST=127.0.0.1 TELLO_COMMAND_PORT=9889 python3 controller.py
+"""
+import time
+import queue
+import socket
+import argparse
+import threading
+from collections import Counter
+
+STATE_PORT = 8890
+VIDEO_PORT = 11111
+VIDEO_CHUNK = 1460  # bytes per datagram, as the drone sends them
+QUERIES = {"battery?": "87", "speed?": "50.0", "time?": "0s", "height?": "0dm", "temp?": "60~62C",
+           "attitude?": "pitch:0;roll:0;yaw:0;", "baro?": "0.0", "tof?": "100mm", "wifi?": "90",
+           "sdk?": "30", "sn?": "0TQDG000000000"}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+class TelloSimulator:
+    def __init__(self, host, port, video=None, fps=30, move_speed=100.0, report_interval=5.0):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.video = video
+        self.fps = fps
+        self.move_speed = move_speed  # cm/s, used to time go/forward/... replies
+        self.report_interval = report_interval
+        self.client = None
+        self.commands = queue.Queue()
+        self.lock = threading.Lock()
+        self.received = Counter()
+        self.latencies = []
+        self.max_queue = 0
+        self.height = 0
+        self.yaw = 0
+        self.streaming = threading.Event()
+
+    def duration(self, command):
+        # Roughly how long the real drone takes before it replies
+        # Raises ValueError on arguments the drone would reject, such as decimals
+        words = command.split()
+        name = words[0] if words else ""
+        if name in ("takeoff", "land"):
+            return 2.0
+        if name in ("up", "down", "left", "right", "forward", "back") and len(words) > 1:
+            return int(words[1]) / self.move_speed
+        if name == "go" and len(words) > 4:
+            distance = max(abs(int(float(value))) for value in words[1:4])
+            return distance / max(10.0, float(words[4]))
+        if name in ("cw", "ccw") and len(words) > 1:
+            return int(words[1]) / 90.0
+        if name == "flip":
+            return 1.0
+        return 0.0
+
+    def listen(self):
+        while True:
+            data, address = self.socket.recvfrom(1024)
+            command = data.decode("utf-8", errors="replace").strip()
+            self.client = address
+            name = command.split()[0] if command else ""
+            with self.lock:
+                self.received[name] += 1
+            if name == "rc":
+                continue  # applied immediately and never acknowledged
+            if name == "emergency":
+                self.flush_queue()
+            self.commands.put((time.time(), command, address))
+            self.max_queue = max(self.max_queue, self.commands.qsize())
+
+    def flush_queue(self):
+        while True:
+            try:
+                self.commands.get_nowait()
+            except queue.Empty:
+                return
+
+    def execute(self):
+        # The drone handles one command at a time, so a backlog shows up as latency
+        while True:
+            received_at, command, address = self.commands.get()
+            name = command.split()[0] if command else ""
+            try:
+                delay = self.duration(command)
+            except (ValueError, IndexError):
+                # A malformed argument gets "error", as on the drone, and must not stop this thread
+                self.reply("error", address, received_at)
+                continue
+            time.sleep(delay)
+            if name == "takeoff":
+                self.height = 80
+            elif name in ("land", "emergency"):
+                self.height = 0
+            elif name == "streamon":
+                self.streaming.set()
+            elif name == "streamoff":
+                self.streaming.clear()
+            self.reply(QUERIES.get(command, "ok"), address, received_at)
+
+    def reply(self, response, address, received_at):
+        self.socket.sendto(response.encode("utf-8"), address)
+        with self.lock:
+            self.latencies.append(time.time() - received_at)
+
+    def send_state(self):
+        while True:
+            time.sleep(0.1)
+            if self.client is None:
+                continue
+            self.yaw = (self.yaw + 181) % 360 - 180  # slow spin so the gyro has something to report
+            state = ("mid:-1;x:0;y:0;z:0;mpry:0,0,0;pitch:0;roll:0;yaw:{};vgx:0;vgy:0;vgz:0;templ:60;"
+                     "temph:62;tof:{};h:{};bat:87;baro:0.00;time:0;agx:0.00;agy:0.00;agz:-1000.00;\r\n"
+                     ).format(self.yaw, self.height * 10 + 100, self.height)
+            self.socket.sendto(state.encode("ascii"), (self.client[0], STATE_PORT))
+
+    def stream_video(self):
+        with open(self.video, "rb") as video_file:
+            data = video_file.read()
+        # Split the Annex B stream on start codes and pace it one slice NAL unit per frame
+        units = [b"\x00\x00\x00\x01" + unit for unit in data.split(b"\x00\x00\x00\x01") if unit]
+        video_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        while True:
+            self.streaming.wait()
+            next_frame = time.time()
+            for unit in units:
+                if not self.streaming.is_set() or self.client is None:
+                    break
+                for start in range(0, len(unit), VIDEO_CHUNK):
+                    video_socket.sendto(unit[start:start + VIDEO_CHUNK], (self.client[0], VIDEO_PORT))
+                if len(unit) > 4 and unit[4] & 0x1F in (1, 5):
+                    next_frame += 1.0 / self.fps
+                    delay = next_frame - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+
+    def report(self):
+        last = time.time()
+        while True:
+            time.sleep(self.report_interval)
+            now = time.time()
+            with self.lock:
+                received, self.received = self.received, Counter()
+                latencies, self.latencies = self.latencies, []
+                max_queue, self.max_queue = self.max_queue, 0
+            total = sum(received.values())
+            print(f"{total / (now - last):.1f} commands/s {dict(received)} | ack latency "
+                  f"p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms"
+                  f" | max queue {max_queue}")
+            last = now
+
+    def run(self):
+        workers = [self.listen, self.execute, self.send_state, self.report]
+        if self.video:
+            workers.append(self.stream_video)
+        for worker in workers:
+            threading.Thread(target=worker, daemon=True).start()
+        print("Tello simulator listening on", self.socket.getsockname())
+        while True:
+            time.sleep(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Tello SDK simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9889, help='command port (the drone uses 8889)')
+    parser.add_argument('--video', help='raw H.264 (Annex B) file to loop on port 11111 after streamon')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--report_interval', type=float, default=5.0)
+    args = parser.parse_args()
+    try:
+        TelloSimulator(args.host, args.port, args.video, args.fps, report_interval=args.report_interval).run()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,104 @@
+import cv2
+import time
+import threading
+
+
+class VideoStage:
+    """
+    Decodes the Tello's H.264 stream on its own thread and downsamples each frame to output_size
+    there, so the flight loop never waits on video. Frames are published with a sequence number;
+    read_newer() returns only frames the caller has not seen yet. Decode FPS and the frames that were
+    overwritten before anyone read them are printed every report_interval seconds. After reopen_after
+    failed reads in a row the capture is reopened, waiting longer between attempts up to max_backoff
+    seconds, so a stream hiccup does not end video for the rest of the flight.
+    """
+
+    def __init__(self, address, output_size=None, report_interval=10.0, reopen_after=100, max_backoff=8.0):
+        self.address = address
+        self.output_size = tuple(output_size) if output_size else None
+        self.report_interval = report_interval
+        self.reopen_after = reopen_after
+        self.max_backoff = max_backoff
+        self.condition = threading.Condition()
+        self.frame = None
+        self.sequence = 0
+        self.read_sequence = 0
+        self.decoded = 0
+        self.dropped = 0
+        self.running = True
+        threading.Thread(target=self.decode, daemon=True).start()
+
+    def open(self):
+        # The overrun/fifo options stop FFmpeg from giving up when frames arrive faster than decoded
+        return cv2.VideoCapture(self.address + "?overrun_nonfatal=1&fifo_size=50000000", cv2.CAP_FFMPEG)
+
+    def decode(self):
+        cap = self.open()
+        failures = 0
+        backoff = 0.5
+        last_report = time.time()
+        reported = 0
+        while self.running:
+            check, frame = cap.read()
+            if not check:
+                failures += 1
+                if failures < self.reopen_after:
+                    time.sleep(0.01)
+                    continue
+                print(f"Video: no frame after {failures} reads, reopening the stream in {backoff:.1f}s")
+                cap.release()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                cap = self.open()
+                failures = 0
+                continue
+            failures = 0
+            backoff = 0.5
+            if self.output_size and frame.shape[1::-1] != self.output_size:
+                frame = cv2.resize(frame, self.output_size, interpolation=cv2.INTER_AREA)
+            with self.condition:
+                if self.sequence != self.read_sequence:
+                    self.dropped += 1  # the previous frame was never read
+                self.frame = frame
+                self.sequence += 1
+                self.decoded += 1
+                self.condition.notify_all()
+            now = time.time()
+            if now - last_report >= self.report_interval:
+                print(f"Video: {(self.decoded - reported) / (now - last_report):.1f} FPS decoded, "
+                      f"{self.dropped} frames dropped")
+                last_report = now
+                reported = self.decoded
+        cap.release()
+
+    def read_newer(self, timeout=1.0):
+        # Waits for a frame newer than the last one returned; (None, None) on timeout
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.sequence != self.read_sequence, timeout):
+                return None, None
+            self.read_sequence = self.sequence
+            return self.sequence, self.frame
+
+    def stop(self):
+        self.running = False
+
+
+class DeltaSlot:
+    """
+    Accumulates retina deltas ({area: {pixel: value}}) until the flight loop takes them; a newer
+    value for a pixel replaces the older one.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def merge(self, camera):
+        with self.lock:
+            for name, data in camera.items():
+                self.pending.setdefault(name, {}).update(data)
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        return pending